@@ -0,0 +1,92 @@
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core import checks
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import CharField, Value
+
+from . import metrics
+from .checks import is_process_local
+from .models import ACCOUNT_KEY, Instructor, Student, account_cache
+
+
+class LoginAccount(NamedTuple):
+    role: str       # "student" or "instructor", stored as session["user_type"]
+    user_id: str    # student_ID / instructor_ID, stored as session["user_id"]
+    password: str   # password hash
+
+
+def find_login_account(email):
+    """
+    Resolve a login email to its role, ID and password hash with one query:
+    a UNION ALL over the unique email indexes of both user tables.
+    returns: LoginAccount, or None if no account uses the email
+    """
+    if not email:
+        return None
+    students = Student.objects.filter(student_email=email).values_list(
+        Value("student", output_field=CharField()), "student_ID", "password",
+    )
+    instructors = Instructor.objects.filter(instructor_email=email).values_list(
+        Value("instructor", output_field=CharField()), "instructor_ID", "password",
+    )
+    rows = list(students.union(instructors, all=True))
+    if not rows:
+        return None
+    # an email registered under both roles logs in as the student, as before
+    rows.sort(key=lambda row: row[0] != "student")
+    return LoginAccount(*rows[0])
+
+
+# Current-user snapshots.
+# CurrentAccountMiddleware exposes the logged-in Student / Instructor as
+# request.account. The row (minus the password hash) is cached per account in
+# the ACCOUNT_CACHE cache, so most requests build it without a query; Student /
+# Instructor save() and delete() drop the snapshot (forget_account in models.py).
+# That only reaches other worker processes if they share the cache: with a
+# per-process cache (local memory) another worker keeps serving a renamed or
+# deleted account for up to ACCOUNT_CACHE_TIMEOUT seconds. `manage.py check
+# --deploy` warns about that; use redis / memcached, or set the timeout to 0.
+
+ACCOUNT_MODELS = {"student": Student, "instructor": Instructor}
+
+
+def _snapshot_fields(model):
+    return [f.attname for f in model._meta.concrete_fields if f.name != "password"]
+
+
+def current_account(request):
+    """
+    The Student / Instructor named by the session, loaded from its cached
+    snapshot or with one primary-key query. The password field is deferred.
+    returns: model instance, or None if nobody (or a deleted account) is logged in
+    """
+    role = request.session.get("user_type")
+    user_id = request.session.get("user_id")
+    model = ACCOUNT_MODELS.get(role)
+    if model is None or not user_id:
+        return None
+
+    cache = account_cache()
+    key = ACCOUNT_KEY.format(role, user_id)
+    snapshot = cache.get(key)
+    metrics.inc("exam_cache_requests_total", cache="account", result="miss" if snapshot is None else "hit")
+    if snapshot is None:
+        snapshot = model.objects.filter(pk=user_id).values(*_snapshot_fields(model)).first()
+        if snapshot is None:
+            return None
+        cache.set(key, snapshot, getattr(settings, "ACCOUNT_CACHE_TIMEOUT", 300))
+    return model.from_db(DEFAULT_DB_ALIAS, list(snapshot), list(snapshot.values()))
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_account_cache(app_configs, **kwargs):
+    alias = getattr(settings, "ACCOUNT_CACHE", "default")
+    if not is_process_local(alias) or getattr(settings, "ACCOUNT_CACHE_TIMEOUT", 300) == 0:
+        return []
+    return [checks.Warning(
+        f"ACCOUNT_CACHE ('{alias}') is not shared by all worker processes, so a changed "
+        "or deleted account stays logged in on the other workers until its snapshot expires.",
+        hint="Point ACCOUNT_CACHE at a redis / memcached cache, or set ACCOUNT_CACHE_TIMEOUT = 0.",
+        id="app.W001",
+    )]
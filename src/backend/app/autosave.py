@@ -0,0 +1,280 @@
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.db import transaction
+
+from . import shards
+from .checks import is_process_local
+from .models import Answer, Choice, ExamAttempt, ExamQuestion
+
+# Answer autosave buffer.
+# The autosave endpoint only stores answer deltas in the cache, one entry per delta.
+# Buffered answers reach the Answer table in batches: every AUTOSAVE_FLUSH_INTERVAL
+# seconds one request flushes all pending attempts, and take_exam merges whatever
+# is still buffered into the final submission.
+# Buffers are keyed by attempt ID (not pk), which also names the attempt's shard.
+#
+# Worker processes share the cache, so nothing is read, modified and written back:
+#   - each delta gets the next number from the attempt's counter (cache.incr) and a
+#     key of its own, so concurrent autosaves never overwrite each other's answers;
+#   - an attempt with new deltas appends itself to a pending log, numbered the same
+#     way; a mark (cache.add) keeps it to one entry per flush interval;
+#   - the flusher claims the flush with cache.add (other requests skip it rather than
+#     wait), writes the deltas up to the numbers it read, then records those numbers
+#     and deletes exactly those deltas; anything buffered meanwhile stays for the next
+#     flush. A delta whose number is taken but whose value is not stored yet ends the
+#     flush of that attempt; the later ones wait for the next flush. Likewise the log
+#     is only read up to its first missing entry; an entry still missing at the next
+#     flush (its worker died in between) is skipped.
+# add() and incr() are only atomic across processes on memcached / redis (and within
+# one process on local memory); see CACHES['autosave'] in settings. On local memory
+# each worker has a buffer of its own and take_exam on another worker does not see
+# it, so `manage.py check --deploy` warns about that.
+
+VERSION_KEY = "autosave:attempt:{}:version"  # deltas numbered so far
+FLUSHED_KEY = "autosave:attempt:{}:flushed"  # deltas up to this number are in the Answer table
+DELTA_KEY = "autosave:attempt:{}:delta:{}"
+MARK_KEY = "autosave:attempt:{}:pending"
+PENDING_SEQ_KEY = "autosave:pending:seq"
+PENDING_KEY = "autosave:pending:{}"
+PENDING_DONE_KEY = "autosave:pending:done"  # log entries up to this number are flushed
+PENDING_GAP_KEY = "autosave:pending:gap"  # missing log entry the last flush stopped at
+LAST_FLUSH_KEY = "autosave:last_flush"
+FLUSH_CLAIM_KEY = "autosave:flushing"
+FLUSH_CLAIM_TIMEOUT = 300  # a flusher that died releases its claim after this long
+
+
+def _cache():
+    return caches[getattr(settings, "AUTOSAVE_CACHE", "default")]
+
+
+def _interval():
+    return getattr(settings, "AUTOSAVE_FLUSH_INTERVAL", 60)
+
+
+def _next(cache, key):
+    # atomic counter: add() creates it once, incr() hands every caller its own number
+    cache.add(key, 0)
+    return cache.incr(key)
+
+
+def _mark_pending(cache, attempt_id):
+    if cache.add(MARK_KEY.format(attempt_id), 1, timeout=_interval()):
+        cache.set(PENDING_KEY.format(_next(cache, PENDING_SEQ_KEY)), attempt_id)
+
+
+def _deltas(cache, attempt_ids):
+    """
+    returns: {attempt ID: (last flushed number, [(number, deltas or None while
+             still being stored), ...])} for the deltas not flushed yet, oldest first
+    """
+    counters = cache.get_many(
+        [VERSION_KEY.format(a) for a in attempt_ids] + [FLUSHED_KEY.format(a) for a in attempt_ids]
+    )
+    numbers = {}
+    for attempt_id in attempt_ids:
+        flushed = counters.get(FLUSHED_KEY.format(attempt_id), 0)
+        version = counters.get(VERSION_KEY.format(attempt_id), 0)
+        numbers[attempt_id] = (flushed, range(flushed + 1, version + 1))
+    stored = cache.get_many([DELTA_KEY.format(a, n) for a, (_, r) in numbers.items() for n in r])
+    return {
+        attempt_id: (flushed, [(n, stored.get(DELTA_KEY.format(attempt_id, n))) for n in r])
+        for attempt_id, (flushed, r) in numbers.items()
+    }
+
+
+def buffer_answers(attempt, deltas):
+    """
+    Add answer deltas ({"q_<question id>": value}) to the attempt's buffer.
+    returns: number of answers currently buffered for the attempt
+    """
+    cache = _cache()
+    number = _next(cache, VERSION_KEY.format(attempt.attempt_id))
+    cache.set(DELTA_KEY.format(attempt.attempt_id, number), deltas)
+    _mark_pending(cache, attempt.attempt_id)
+
+    flush_pending()
+    return len(buffered_answers(attempt))
+
+
+def buffered_answers(attempt):
+    merged = {}
+    _, deltas = _deltas(_cache(), [attempt.attempt_id])[attempt.attempt_id]
+    for _, data in deltas:
+        merged.update(data or {})
+    return merged
+
+
+def discard(attempt):
+    """
+    Drop the attempt's buffer, e.g. once its final submission is stored.
+    """
+    cache = _cache()
+    attempt_id = attempt.attempt_id
+    version = cache.get(VERSION_KEY.format(attempt_id), 0)
+    cache.delete_many(
+        [VERSION_KEY.format(attempt_id), FLUSHED_KEY.format(attempt_id), MARK_KEY.format(attempt_id)]
+        + [DELTA_KEY.format(attempt_id, n) for n in range(1, version + 1)]
+    )
+
+
+def flush_pending(force=False):
+    """
+    Write every pending buffer to Answer rows (one transaction per shard), at
+    most once per AUTOSAVE_FLUSH_INTERVAL unless force is set.
+    returns: number of Answer rows written
+    """
+    cache = _cache()
+    now = time.time()
+    # the first buffered answer since start-up starts the timer
+    cache.add(LAST_FLUSH_KEY, now)
+    if not force and now - cache.get(LAST_FLUSH_KEY, now) < _interval():
+        return 0
+    # one flush at a time; everyone else carries on instead of waiting for it
+    if not cache.add(FLUSH_CLAIM_KEY, now, timeout=FLUSH_CLAIM_TIMEOUT):
+        return 0
+    try:
+        cache.set(LAST_FLUSH_KEY, now)
+        done = cache.get(PENDING_DONE_KEY, 0)
+        seq = cache.get(PENDING_SEQ_KEY, 0)
+        entries = cache.get_many([PENDING_KEY.format(n) for n in range(done + 1, seq + 1)])
+        # up to the first entry whose number is taken but whose value is not stored yet
+        gap = cache.get(PENDING_GAP_KEY)
+        upto = done
+        for n in range(done + 1, seq + 1):
+            if PENDING_KEY.format(n) not in entries and n != gap:
+                cache.set(PENDING_GAP_KEY, n)
+                break
+            upto = n
+        log_keys = [PENDING_KEY.format(n) for n in range(done + 1, upto + 1)]
+        attempt_ids = sorted({entries[key] for key in log_keys if key in entries})
+        if not attempt_ids:
+            cache.set(PENDING_DONE_KEY, upto)
+            return 0
+        # unmarked before the deltas are read: an attempt that gets more from here on logs itself again
+        cache.delete_many([MARK_KEY.format(a) for a in attempt_ids])
+
+        buffers, flushed, unfinished = {}, {}, []
+        for attempt_id, (start, deltas) in _deltas(cache, attempt_ids).items():
+            merged, last = {}, start
+            for number, data in deltas:
+                if data is None:
+                    unfinished.append(attempt_id)
+                    break
+                merged.update(data)
+                last = number
+            if last > start:
+                buffers[attempt_id] = merged
+                flushed[attempt_id] = (last, [n for n, _ in deltas if n <= last])
+
+        written = write_answers(buffers)
+
+        cache.set_many({FLUSHED_KEY.format(a): last for a, (last, _) in flushed.items()})
+        cache.delete_many([DELTA_KEY.format(a, n) for a, (_, numbers) in flushed.items() for n in numbers])
+        cache.set(PENDING_DONE_KEY, upto)
+        cache.delete_many(log_keys)
+        for attempt_id in unfinished:
+            _mark_pending(cache, attempt_id)
+    finally:
+        cache.delete(FLUSH_CLAIM_KEY)
+    return written
+
+
+def write_answers(buffers):
+    """
+    Store buffered answers ({attempt ID: {"q_<id>": value}}) for attempts that
+    are still open. Answers stay ungraded (marks=None) until the final submit.
+    """
+    return sum(
+        _write_shard(alias, {k: v for k, v in buffers.items() if shards.for_attempt_id(k) == alias})
+        for alias in shards.aliases()
+    )
+
+
+def _write_shard(alias, buffers):
+    question_ids = {
+        int(field[2:]) for data in buffers.values() for field in data if field[2:].isdigit()
+    }
+    if not question_ids:
+        return 0
+
+    with transaction.atomic(), shards.writing(alias):
+        attempts = {
+            a.attempt_id: a for a in ExamAttempt.objects.select_for_update()
+            .filter(attempt_id__in=buffers, submitted_at__isnull=True)
+        }
+        questions = ExamQuestion.objects.in_bulk(question_ids)
+        choices = {c.id: c for c in Choice.objects.filter(choice_id__in=question_ids)}
+        existing = {
+            (a.attempt_id, a.question_id): a
+            for a in Answer.objects.filter(attempt__in=list(attempts.values()), question_id__in=question_ids)
+        }
+
+        new_answers = []
+        changed_answers = []
+        for attempt_id, data in buffers.items():
+            attempt = attempts.get(attempt_id)
+            if attempt is None:
+                continue
+            for field, value in data.items():
+                question = questions.get(int(field[2:])) if field[2:].isdigit() else None
+                if question is None or question.exam_id != attempt.exam_id:
+                    continue
+
+                selected_choice = None
+                text_answer = ""
+                if question.question_type == "MCQ":
+                    selected_choice = choices.get(int(value)) if str(value).isdigit() else None
+                    if selected_choice is None or selected_choice.choice_id_id != question.id:
+                        continue
+                else:
+                    text_answer = str(value)
+                    if not text_answer.strip():
+                        continue
+
+                answer = existing.get((attempt.pk, question.id))
+                if answer is None:
+                    new_answers.append(Answer(
+                        attempt=attempt,
+                        question=question,
+                        selected_choice=selected_choice,
+                        text_answer=text_answer,
+                    ))
+                else:
+                    answer.selected_choice = selected_choice
+                    answer.text_answer = text_answer
+                    changed_answers.append(answer)
+
+        Answer.objects.bulk_create(new_answers, ignore_conflicts=True)
+        Answer.objects.bulk_update(changed_answers, ["selected_choice", "text_answer"])
+    return len(new_answers) + len(changed_answers)
+
+
+def saved_answers(attempt):
+    """
+    Answers the student has already given, as form values ({"q_<id>": value}),
+    with anything still buffered taking precedence over stored rows.
+    """
+    values = {}
+    for answer in Answer.objects.using(shards.for_attempt(attempt)).filter(attempt=attempt):
+        if answer.selected_choice_id:
+            values[f"q_{answer.question_id}"] = str(answer.selected_choice_id)
+        elif answer.text_answer:
+            values[f"q_{answer.question_id}"] = answer.text_answer
+    values.update(buffered_answers(attempt))
+    return values
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_autosave_cache(app_configs, **kwargs):
+    alias = getattr(settings, "AUTOSAVE_CACHE", "default")
+    if not is_process_local(alias):
+        return []
+    return [checks.Warning(
+        f"AUTOSAVE_CACHE ('{alias}') is not shared by all worker processes, so answers "
+        "autosaved on one worker are missing from a submission handled by another.",
+        hint="Point AUTOSAVE_CACHE at a redis / memcached cache.",
+        id="app.W003",
+    )]
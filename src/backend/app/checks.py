@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core import checks
+
+# Deploy checks (`manage.py check --deploy`) for settings that only work with one
+# worker process. The request.account snapshot check lives in app/accounts.py and
+# the autosave buffer check in app/autosave.py, next to the code they guard.
+
+CACHED_SESSION_ENGINES = {
+    "django.contrib.sessions.backends.cache",
+    "django.contrib.sessions.backends.cached_db",
+}
+
+
+def is_process_local(alias):
+    return settings.CACHES.get(alias, {}).get("BACKEND") == "django.core.cache.backends.locmem.LocMemCache"
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_session_cache(app_configs, **kwargs):
+    alias = getattr(settings, "SESSION_CACHE_ALIAS", "default")
+    if settings.SESSION_ENGINE not in CACHED_SESSION_ENGINES or not is_process_local(alias):
+        return []
+    return [checks.Warning(
+        f"SESSION_CACHE_ALIAS ('{alias}') is not shared by all worker processes, so a logout "
+        "only ends the session on the worker that handled it; the others keep accepting the cookie.",
+        hint="Point SESSION_CACHE_ALIAS at a redis / memcached cache, or set SESSION_MODE = 'db'.",
+        id="app.W002",
+    )]
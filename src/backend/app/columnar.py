@@ -0,0 +1,287 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import shards
+from .models import Answer, Choice, ExamAttempt, QueuedSubmission
+
+# Columnar (NumPy .npz) export of answers for analysis.
+# Each exam gets a directory with
+#   part-00000.npz, ...  one row per answer: attempt, student, question, choice
+#                        (int32 indexes, choice -1 when none) and marks (float32, NaN
+#                        while ungraded)
+#   dictionary.npz       what the indexes stand for: attempt / student / question /
+#                        choice IDs and their attributes (submitted_at, score,
+#                        question_no, question_type, max marks, is_correct)
+#   manifest.json        number of parts and the watermark: the (submitted_at, pk)
+#                        of the last attempt exported
+# A run appends one part per chunk of attempts submitted after the watermark, so
+# only new submissions are read. Dictionaries only grow, so indexes in earlier
+# parts stay valid. Marks changed after an attempt was exported (manual grading
+# of text answers) are only picked up by a full re-export (full=True).
+# Queued submissions (SUBMISSION_MODE = 'queued') have no answers until
+# process_submissions grades them, so a run stops at the first attempt still in
+# the queue and picks it up, and everything after it, on a later run.
+# load() concatenates exams into one set of arrays, e.g. for a semester.
+
+FORMAT_VERSION = 1
+
+
+class _Codes:
+    # append-only dictionary encoding: value -> stable int index
+    def __init__(self, values=()):
+        self.values = list(values)
+        self.index = {value: i for i, value in enumerate(self.values)}
+
+    def code(self, value):
+        i = self.index.get(value)
+        if i is None:
+            i = self.index[value] = len(self.values)
+            self.values.append(value)
+        return i
+
+
+def _utc64(value):
+    return np.datetime64(value.astimezone(dt_timezone.utc).replace(tzinfo=None), "us")
+
+
+def _save(path, **arrays):
+    # write next to the target and rename, so a reader never sees half a file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".npz")
+    with os.fdopen(fd, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+
+
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, "manifest.json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"format": FORMAT_VERSION, "parts": 0, "rows": 0, "watermark": None}
+
+
+def _write_manifest(directory, manifest):
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(directory, "manifest.json"))
+
+
+def _read_dictionary(directory):
+    path = os.path.join(directory, "dictionary.npz")
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def _attributes(codes, current, old, default):
+    # one value per dictionary entry: current[id] while the row exists, else the exported one
+    old = old.tolist() if old is not None else []
+    return [
+        current[value] if value in current else old[i] if i < len(old) else default
+        for i, value in enumerate(codes.values)
+    ]
+
+
+def _after_watermark(attempts, manifest):
+    if not manifest["watermark"]:
+        return attempts
+    submitted_at, pk = parse_datetime(manifest["watermark"][0]), manifest["watermark"][1]
+    return attempts.filter(Q(submitted_at__gt=submitted_at) | Q(submitted_at=submitted_at, id__gt=pk))
+
+
+def export_exam(exam, directory, chunk_size=1000, full=False, lag=60):
+    """
+    Append the answers of exam's attempts submitted since the last run to directory.
+
+    chunk_size: attempts per part file
+    full: drop what was exported before and start over
+    lag: leave out attempts submitted in the last lag seconds, whose
+         transactions may not all have committed yet; stops before the first
+         attempt still waiting in the submission queue
+    returns: number of answer rows appended
+    """
+    if full and os.path.isdir(directory):
+        shutil.rmtree(directory)
+    os.makedirs(directory, exist_ok=True)
+    manifest = _read_manifest(directory)
+    previous = _read_dictionary(directory) or {}
+
+    def codes(name):
+        return _Codes(previous[name].tolist() if name in previous else ())
+
+    attempt_codes, student_codes = codes("attempts"), codes("students")
+    question_codes, choice_codes = codes("questions"), codes("choices")
+    attempt_student = previous.get("attempt_student", np.empty(0, np.int32)).tolist()
+    attempt_submitted = previous.get("attempt_submitted_at", np.empty(0, "datetime64[us]")).tolist()
+    attempt_score = previous.get("attempt_score", np.empty(0)).tolist()
+
+    # questions and choices are re-read every run; ones deleted since keep their old attributes
+    questions = {q.pk: q for q in exam.questions.order_by("order_no", "id")}
+    choices = {c.pk: c for c in Choice.objects.filter(choice_id__exam_id=exam.pk).order_by("id")}
+    for question_id in questions:
+        question_codes.code(question_id)
+    for choice_id in choices:
+        choice_codes.code(choice_id)
+    question_attributes = {
+        "question_no": ({pk: q.order_no for pk, q in questions.items()}, -1, np.int32),
+        "question_type": ({pk: q.question_type for pk, q in questions.items()}, "", str),
+        "question_marks": ({pk: q.marks or 0 for pk, q in questions.items()}, np.nan, np.float64),
+    }
+    choice_attributes = {
+        "choice_question": ({pk: question_codes.code(c.choice_id_id) for pk, c in choices.items()}, -1, np.int32),
+        "choice_correct": ({pk: c.is_correct for pk, c in choices.items()}, False, bool),
+    }
+
+    db = shards.for_exam(exam)
+    attempts = ExamAttempt.objects.using(db).filter(
+        exam_id=exam.pk,
+        submitted_at__isnull=False,
+        submitted_at__lte=timezone.now() - timedelta(seconds=lag),
+    )
+    queued = QueuedSubmission.objects.using(db).filter(attempt=OuterRef("pk"), processed_at__isnull=True)
+    # the watermark must not pass an attempt whose answers are not written yet
+    first_pending = (
+        _after_watermark(attempts, manifest)
+        .filter(Exists(queued))
+        .order_by("submitted_at", "id")
+        .values_list("submitted_at", "id")
+        .first()
+    )
+    attempts = attempts.filter(~Exists(queued))
+    if first_pending:
+        submitted_at, pk = first_pending
+        attempts = attempts.filter(Q(submitted_at__lt=submitted_at) | Q(submitted_at=submitted_at, id__lt=pk))
+    appended = 0
+    while True:
+        batch = list(
+            _after_watermark(attempts, manifest)
+            .order_by("submitted_at", "id")
+            .values_list("id", "attempt_id", "student_id", "submitted_at", "score")[:chunk_size]
+        )
+        if not batch:
+            break
+
+        attempt_index = {}
+        for pk, attempt_id, student_id, submitted_at, score in batch:
+            attempt_index[pk] = attempt_codes.code(attempt_id)
+            if attempt_index[pk] < len(attempt_student):
+                continue  # in the dictionary of a run that died before its manifest
+            attempt_student.append(student_codes.code(student_id))
+            attempt_submitted.append(_utc64(submitted_at))
+            attempt_score.append(np.nan if score is None else score)
+
+        rows = list(
+            Answer.objects.using(db)
+            .filter(attempt_id__in=attempt_index)
+            .order_by("attempt_id", "question_id")
+            .values_list("attempt_id", "question_id", "selected_choice_id", "marks")
+        )
+        attempt_col = np.fromiter((attempt_index[r[0]] for r in rows), np.int32, len(rows))
+        part = {
+            "attempt": attempt_col,
+            "student": np.asarray(attempt_student, np.int32)[attempt_col],
+            "question": np.fromiter((question_codes.code(r[1]) for r in rows), np.int32, len(rows)),
+            "choice": np.fromiter(
+                (-1 if r[2] is None else choice_codes.code(r[2]) for r in rows), np.int32, len(rows)
+            ),
+            "marks": np.fromiter((np.nan if r[3] is None else r[3] for r in rows), np.float32, len(rows)),
+        }
+        _save(os.path.join(directory, f"part-{manifest['parts']:05d}.npz"), **part)
+
+        attributes = {
+            name: np.array(_attributes(codes_, current, previous.get(name), default), dtype=dtype)
+            for codes_, group in [(question_codes, question_attributes), (choice_codes, choice_attributes)]
+            for name, (current, default, dtype) in group.items()
+        }
+        _save(
+            os.path.join(directory, "dictionary.npz"),
+            attempts=np.array(attempt_codes.values, dtype=str),
+            attempt_student=np.asarray(attempt_student, np.int32),
+            attempt_submitted_at=np.array(attempt_submitted, dtype="datetime64[us]"),
+            attempt_score=np.asarray(attempt_score, np.float64),
+            students=np.array(student_codes.values, dtype=str),
+            questions=np.asarray(question_codes.values, np.int64),
+            choices=np.asarray(choice_codes.values, np.int64),
+            **attributes,
+        )
+        # the manifest is written last: a run that dies half-way is redone from the old watermark
+        last = batch[-1]
+        manifest.update(
+            parts=manifest["parts"] + 1,
+            rows=manifest["rows"] + len(rows),
+            watermark=[last[3].isoformat(), last[0]],
+            exam_id=exam.exam_id,
+        )
+        _write_manifest(directory, manifest)
+        appended += len(rows)
+    return appended
+
+
+def load_exam(directory):
+    """
+    returns: {column or dictionary name: array} for one exported exam, parts concatenated
+    """
+    manifest = _read_manifest(directory)
+    columns = {}
+    for i in range(manifest["parts"]):
+        with np.load(os.path.join(directory, f"part-{i:05d}.npz")) as part:
+            for name in part.files:
+                columns.setdefault(name, []).append(part[name])
+    table = {name: np.concatenate(arrays) for name, arrays in columns.items()}
+    table.update(_read_dictionary(directory) or {})
+    table["exam_id"] = manifest.get("exam_id", os.path.basename(directory))
+    return table
+
+
+def load(root, exam_ids=None):
+    """
+    Concatenate exported exams (every directory under root, or just exam_ids)
+    into one table: attempt / question / choice indexes are offset per exam,
+    students are re-encoded into one shared dictionary, and an "exam" column
+    indexes "exams".
+    """
+    if exam_ids is None:
+        exam_ids = sorted(
+            name for name in os.listdir(root) if os.path.exists(os.path.join(root, name, "manifest.json"))
+        )
+    tables = [load_exam(os.path.join(root, exam_id)) for exam_id in exam_ids]
+    tables = [t for t in tables if "marks" in t]
+    if not tables:
+        return {"exams": np.array(exam_ids, dtype=str), "students": np.array([], dtype=str)}
+
+    students = np.unique(np.concatenate([t["students"] for t in tables]))
+    merged = {name: [] for name in ["exam", "attempt", "student", "question", "choice", "marks"]}
+    dictionaries = {name: [] for name in tables[0] if name not in merged and name not in ("students", "exam_id")}
+    offsets = {"attempt": 0, "question": 0, "choice": 0}
+    for i, t in enumerate(tables):
+        merged["exam"].append(np.full(len(t["marks"]), i, np.int32))
+        merged["attempt"].append(t["attempt"] + offsets["attempt"])
+        merged["student"].append(np.searchsorted(students, t["students"]).astype(np.int32)[t["student"]])
+        merged["question"].append(t["question"] + offsets["question"])
+        merged["choice"].append(np.where(t["choice"] < 0, -1, t["choice"] + offsets["choice"]))
+        merged["marks"].append(t["marks"])
+        for name in dictionaries:
+            values = t[name]
+            if name == "attempt_student":
+                values = np.searchsorted(students, t["students"]).astype(np.int32)[values]
+            elif name == "choice_question":
+                values = np.where(values < 0, -1, values + offsets["question"])
+            dictionaries[name].append(values)
+        offsets["attempt"] += len(t["attempts"])
+        offsets["question"] += len(t["questions"])
+        offsets["choice"] += len(t["choices"])
+
+    table = {name: np.concatenate(arrays) for name, arrays in {**merged, **dictionaries}.items()}
+    table["exams"] = np.array([t["exam_id"] for t in tables], dtype=str)
+    table["students"] = students
+    return table
@@ -0,0 +1,176 @@
+import csv
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from . import shards
+from .grading import grade_scores
+from .models import Answer, Choice, ExamAttempt, ExamQuestion, Student
+
+# Streaming exports of submitted attempts and their answers, as CSV or JSON Lines.
+# Rows come off a database cursor (.iterator(chunk_size=EXPORT_CHUNK_SIZE)) and are
+# written out a chunk at a time; the students and grades of a chunk are looked up
+# with one query / one vectorized pass per chunk, and all exported exams share
+# those queries (one set per attempt shard). Only the exams, questions and choices
+# are held in full, so memory does not grow with the number of attempts or answers.
+
+ATTEMPT_COLUMNS = [
+    "exam_id", "exam_title", "attempt_id", "student_id", "student_name", "matric_number",
+    "started_at", "submitted_at", "score", "total_possible", "percent", "grade",
+]
+ANSWER_COLUMNS = [
+    "exam_id", "attempt_id", "student_id", "matric_number", "question_no", "question_type",
+    "selected_choice", "is_correct", "text_answer", "marks", "max_marks",
+]
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson; charset=utf-8",
+}
+
+
+def _chunk_size():
+    return getattr(settings, "EXPORT_CHUNK_SIZE", 2000)
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _students(student_ids):
+    return Student.objects.only("student_ID", "full_name", "matric_number").in_bulk(set(student_ids))
+
+
+def _by_shard(exams):
+    """
+    returns: [(database alias, [exam pk, ...])] covering every exam, one query's worth each
+    """
+    groups = {}
+    for exam in exams.values():
+        groups.setdefault(shards.for_exam(exam), []).append(exam.pk)
+    return list(groups.items())
+
+
+def attempt_rows(exams):
+    """
+    Submitted attempts of the exams ({pk: Exam}), exam by exam and oldest first,
+    with percent and grade.
+    """
+    for db, exam_ids in _by_shard(exams):
+        attempts = (
+            ExamAttempt.objects.using(db)
+            .filter(exam_id__in=exam_ids, submitted_at__isnull=False)
+            .order_by("exam_id", "submitted_at", "id")
+            .values_list("exam_id", "attempt_id", "student_id", "started_at", "submitted_at", "score")
+            .iterator(chunk_size=_chunk_size())
+        )
+        for chunk in _chunks(attempts, _chunk_size()):
+            students = _students(row[2] for row in chunk)
+            report = grade_scores([row[5] for row in chunk], [exams[row[0]].total_marks for row in chunk])
+            for (exam_pk, attempt_id, student_id, started_at, submitted_at, score), percent, grade in zip(
+                chunk, report.percents, report.grades
+            ):
+                exam = exams[exam_pk]
+                student = students.get(student_id)
+                yield {
+                    "exam_id": exam.exam_id,
+                    "exam_title": exam.title,
+                    "attempt_id": attempt_id,
+                    "student_id": student_id,
+                    "student_name": student.full_name if student else None,
+                    "matric_number": student.matric_number if student else None,
+                    "started_at": started_at,
+                    "submitted_at": submitted_at,
+                    "score": score,
+                    "total_possible": exam.total_marks,
+                    "percent": percent,
+                    "grade": grade,
+                }
+
+
+def answer_rows(exams):
+    """
+    Answers of the submitted attempts of the exams ({pk: Exam}), by exam, attempt and question.
+    """
+    questions = {q.id: q for q in ExamQuestion.objects.filter(exam_id__in=list(exams))}
+    choices = {c.id: c for c in Choice.objects.filter(choice_id__exam_id__in=list(exams))}
+    for db, exam_ids in _by_shard(exams):
+        answers = (
+            Answer.objects.using(db)
+            .filter(attempt__exam_id__in=exam_ids, attempt__submitted_at__isnull=False)
+            .order_by("attempt__exam_id", "attempt_id", "question_id")
+            .values_list(
+                "attempt__exam_id", "attempt__attempt_id", "attempt__student_id", "question_id",
+                "selected_choice_id", "text_answer", "marks",
+            )
+            .iterator(chunk_size=_chunk_size())
+        )
+        for chunk in _chunks(answers, _chunk_size()):
+            students = _students(row[2] for row in chunk)
+            for exam_pk, attempt_id, student_id, question_id, choice_id, text_answer, marks in chunk:
+                question = questions.get(question_id)
+                choice = choices.get(choice_id)
+                student = students.get(student_id)
+                yield {
+                    "exam_id": exams[exam_pk].exam_id,
+                    "attempt_id": attempt_id,
+                    "student_id": student_id,
+                    "matric_number": student.matric_number if student else None,
+                    "question_no": question.order_no if question else None,
+                    "question_type": question.question_type if question else None,
+                    "selected_choice": choice.choice_text if choice else None,
+                    "is_correct": choice.is_correct if choice else None,
+                    "text_answer": text_answer,
+                    "marks": marks,
+                    "max_marks": question.marks if question else None,
+                }
+
+
+KINDS = {
+    "attempts": (attempt_rows, ATTEMPT_COLUMNS),
+    "answers": (answer_rows, ANSWER_COLUMNS),
+}
+
+
+class _Echo:
+    # csv.writer target that hands each formatted line back instead of storing it
+    def write(self, value):
+        return value
+
+
+# text starting with these is run as a formula by Excel / Sheets (CSV injection)
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _csv_value(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        # a leading quote makes the spreadsheet show the text instead of evaluating it
+        return "'" + value
+    return value
+
+
+def lines(exams, kind, fmt):
+    """
+    The export of kind ("attempts" / "answers") for each exam in turn, in
+    format fmt ("csv" / "jsonl"), as blocks of text for a StreamingHttpResponse.
+    The exams are read once, up front; rows of all of them share each query.
+    """
+    rows_for, columns = KINDS[kind]
+    rows = rows_for({exam.pk: exam for exam in exams})
+    if fmt == "csv":
+        writer = csv.writer(_Echo())
+        yield writer.writerow(columns)
+        for chunk in _chunks(rows, _chunk_size()):
+            yield "".join(writer.writerow([_csv_value(row[c]) for c in columns]) for row in chunk)
+    else:
+        for chunk in _chunks(rows, _chunk_size()):
+            yield "".join(json.dumps(row, cls=DjangoJSONEncoder) + "\n" for row in chunk)
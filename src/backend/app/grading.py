@@ -0,0 +1,52 @@
+from typing import NamedTuple
+
+import numpy as np
+
+# Grade bands, highest first. A score lands in the first band whose cutoff it reaches.
+GRADE_LETTERS = ["A", "B", "C", "D", "F"]
+GRADE_LABELS = ["A (90-100)", "B (80-89)", "C (70-79)", "D (60-69)", "F (<60)"]
+GRADE_CUTOFFS = [90, 80, 70, 60]  # percent needed for A, B, C, D
+PASS_PERCENT = 50
+
+
+class GradeReport(NamedTuple):
+    percents: list   # float percent per row, None where it cannot be computed
+    grades: list     # "A".."F" per row, None where percent is None
+    passed: list     # True/False per row, None where percent is None
+    buckets: list    # row counts per grade, same order as GRADE_LABELS
+
+
+def grade_scores(scores, totals):
+    """
+    Grade many attempts in one vectorized pass.
+
+    scores: sequence of awarded marks (None = not graded)
+    totals: sequence of total possible marks, or a single number for one exam
+    returns: GradeReport with plain Python lists, ready for templates / json
+    """
+    scores = np.asarray(scores, dtype=float).reshape(-1)  # None -> nan
+    totals = np.broadcast_to(np.asarray(totals, dtype=float), scores.shape)
+
+    valid = ~np.isnan(scores) & (totals > 0)
+    percents = np.divide(scores, totals, out=np.zeros_like(scores), where=valid) * 100
+
+    # digitize gives 0 for F .. 4 for A; flip it so the index matches GRADE_LETTERS
+    band = len(GRADE_CUTOFFS) - np.digitize(percents, GRADE_CUTOFFS[::-1])
+    buckets = np.bincount(band[valid], minlength=len(GRADE_LETTERS))
+
+    letters = np.array(GRADE_LETTERS, dtype=object)[band]
+    return GradeReport(
+        percents=np.where(valid, percents, None).tolist(),
+        grades=np.where(valid, letters, None).tolist(),
+        passed=np.where(valid, percents >= PASS_PERCENT, None).tolist(),
+        buckets=buckets.tolist(),
+    )
+
+
+def grade_one(score, total):
+    """
+    Convenience wrapper for a single attempt.
+    returns: (percent, grade, passed), each None when it cannot be computed
+    """
+    report = grade_scores([score], [total])
+    return report.percents[0], report.grades[0], report.passed[0]
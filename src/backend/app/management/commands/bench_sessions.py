@@ -0,0 +1,83 @@
+import time
+import uuid
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from app.models import Student
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure session overhead per request for each SESSION_MODE: latency of "
+        "authenticated student pages, django_session queries per request, and raw "
+        "session load/save cost. Seeds one student and deletes it afterwards; "
+        "run it against a copy of the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500, help="Page requests per mode.")
+        parser.add_argument("--modes", nargs="+", choices=list(settings.SESSION_ENGINES),
+                            default=list(settings.SESSION_ENGINES))
+
+    def handle(self, *args, **options):
+        run = uuid.uuid4().hex[:6]
+        student = Student.objects.create(
+            full_name="Session Benchmark",
+            student_email=f"session-bench-{run}@example.com",
+            matric_number=f"S{run}",
+            password="unused",
+        )
+        try:
+            for mode in options["modes"]:
+                engine = settings.SESSION_ENGINES[mode]
+                with override_settings(SESSION_ENGINE=engine, ALLOWED_HOSTS=["*"]):
+                    self._bench(mode, engine, student, options["requests"])
+        finally:
+            student.delete()
+
+    def _bench(self, mode, engine, student, n):
+        client = Client()
+        session = client.session
+        session["user_type"] = "student"
+        session["user_id"] = student.student_ID
+        session.save()
+        # signed_cookies changes the key on every save; point the cookie at the current one
+        client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+        urls = [reverse("student_available_exams"), reverse("student_results")]
+        client.get(urls[0])  # warm-up: caches, request.account snapshot
+
+        errors = 0
+        start = time.perf_counter()
+        with CaptureQueriesContext(connection) as ctx:
+            for i in range(n):
+                errors += client.get(urls[i % len(urls)]).status_code != 200
+        elapsed = time.perf_counter() - start
+        session_sql = [q["sql"] for q in ctx.captured_queries if "django_session" in q["sql"]]
+        session_writes = [sql for sql in session_sql if not sql.lstrip().upper().startswith("SELECT")]
+
+        # the session store alone: load on every request, save when it changes (e.g. login)
+        store_class = import_module(engine).SessionStore
+        key = client.cookies[settings.SESSION_COOKIE_NAME].value
+        start = time.perf_counter()
+        for _ in range(n):
+            store_class(session_key=key).load()
+        load_us = (time.perf_counter() - start) * 1e6 / n
+        start = time.perf_counter()
+        for i in range(n):
+            store = store_class(session_key=key)
+            store["bench"] = i
+            store.save()
+        save_us = (time.perf_counter() - start) * 1e6 / n
+        store_class(session_key=key).delete()
+
+        self.stdout.write(
+            f"{mode:>14}: {elapsed * 1000 / n:6.2f} ms/request ({errors} errors) | "
+            f"session queries/request {len(session_sql) / n:4.2f} (writes {len(session_writes) / n:4.2f}) | "
+            f"load {load_us:8.1f} us | save {save_us:8.1f} us"
+        )
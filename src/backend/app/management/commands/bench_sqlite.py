@@ -0,0 +1,66 @@
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import override_settings
+
+# Connection settings compared by the benchmark. "stock" is Django's SQLite default:
+# rollback journal, synchronous=FULL, deferred transactions, a new connection per request.
+STOCK = {"OPTIONS": {}, "CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False}
+TUNED_KEYS = ("OPTIONS", "CONN_MAX_AGE", "CONN_HEALTH_CHECKS")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare concurrent take_exam submission throughput with Django's stock SQLite "
+        "connection settings and the tuned ones from settings.DATABASES (SQLITE_PRAGMAS, "
+        "IMMEDIATE transactions, persistent connections). Each profile runs "
+        "bench_submissions against its own freshly migrated temporary database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=200)
+        parser.add_argument("--questions", type=int, default=20)
+        parser.add_argument("--threads", type=int, default=8, help="Concurrent submitting clients.")
+        parser.add_argument("--profiles", nargs="+", choices=["stock", "tuned"], default=["stock", "tuned"])
+
+    def handle(self, *args, **options):
+        db = connections["default"].settings_dict
+        if db["ENGINE"] != "django.db.backends.sqlite3":
+            raise CommandError("bench_sqlite only applies to the sqlite3 backend.")
+        # every thread's connection wrapper shares this dict, so updating it in place
+        # switches the settings for all connections opened afterwards
+        original = {key: db[key] for key in ("NAME",) + TUNED_KEYS}
+        profiles = {"stock": STOCK, "tuned": {key: original[key] for key in TUNED_KEYS}}
+
+        # same filesystem as the real database, so fsync costs are comparable
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(original["NAME"])) as directory, \
+                override_settings(REQUEST_TIMING_SAMPLE_RATE=0, REQUEST_TIMING_SLOW_MS=float("inf")):
+            try:
+                for name in options["profiles"]:
+                    connections.close_all()
+                    db.update(profiles[name], NAME=os.path.join(directory, f"{name}.sqlite3"))
+                    call_command("migrate", verbosity=0)
+                    with connections["default"].cursor() as cursor:
+                        cursor.execute("PRAGMA journal_mode")
+                        journal_mode = cursor.fetchone()[0]
+                        cursor.execute("PRAGMA synchronous")
+                        synchronous = cursor.fetchone()[0]
+                    self.stdout.write(
+                        f"{name}: journal_mode={journal_mode} synchronous={synchronous} "
+                        f"transaction_mode={db['OPTIONS'].get('transaction_mode') or 'DEFERRED'} "
+                        f"CONN_MAX_AGE={db['CONN_MAX_AGE']}"
+                    )
+                    call_command(
+                        "bench_submissions",
+                        students=options["students"],
+                        questions=options["questions"],
+                        threads=options["threads"],
+                        mode="inline",
+                        stdout=self.stdout,
+                    )
+            finally:
+                connections.close_all()
+                db.update(original)
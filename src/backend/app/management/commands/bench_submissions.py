@@ -0,0 +1,115 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from app.models import Choice, Exam, ExamQuestion, Instructor, Student, allocate_ids
+from app.submissions import process_queue
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare take_exam submission throughput in the inline and queued modes. "
+        "Seeds its own exam and students and deletes them afterwards; "
+        "run it against a copy of the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=200)
+        parser.add_argument("--questions", type=int, default=20)
+        parser.add_argument("--threads", type=int, default=1, help="Concurrent submitting clients.")
+        parser.add_argument("--mode", choices=["inline", "queued", "both"], default="both")
+        parser.add_argument("--coalesce", action="store_true",
+                            help="Commit submissions through the group-commit writer thread (WRITE_COALESCING).")
+
+    def handle(self, *args, **options):
+        modes = ["inline", "queued"] if options["mode"] == "both" else [options["mode"]]
+        run = uuid.uuid4().hex[:6]
+        password = make_password("bench1234")
+
+        instructor = Instructor.objects.create(
+            full_name="Benchmark Instructor",
+            instructor_email=f"bench-{run}@example.com",
+            password=password,
+        )
+        students = []
+        try:
+            now = timezone.now()
+            exam = Exam.objects.create(
+                title=f"Submission benchmark {run}",
+                start_time=now - timedelta(minutes=5),
+                end_time=now + timedelta(hours=2),
+                created_by=instructor,
+            )
+            post_data = {}
+            for i in range(options["questions"]):
+                q = ExamQuestion.objects.create(exam=exam, question_text=f"Q{i + 1}", question_type="MCQ", order_no=i + 1)
+                correct = Choice.objects.create(choice_id=q, choice_text="right", is_correct=True)
+                Choice.objects.create(choice_id=q, choice_text="wrong", is_correct=False)
+                post_data[f"q_{q.id}"] = str(correct.id)
+
+            for mode in modes:
+                ids = allocate_ids("student", options["students"])
+                batch = Student.objects.bulk_create([
+                    Student(
+                        student_ID=ids[i],
+                        full_name=f"Bench Student {i}",
+                        student_email=f"bench-{run}-{mode}-{i}@example.com",
+                        matric_number=f"B{run}{mode[0]}{i:05d}",
+                        password=password,
+                    )
+                    for i in range(options["students"])
+                ])
+                students += batch
+                self._run(mode, exam, batch, post_data, options["threads"], options["coalesce"])
+        finally:
+            exam_qs = Exam.objects.filter(created_by=instructor)
+            exam_qs.delete()
+            Student.objects.filter(pk__in=[s.pk for s in students]).delete()
+            instructor.delete()
+
+    def _run(self, mode, exam, students, post_data, threads, coalesce=False):
+        with override_settings(SUBMISSION_MODE=mode, ALLOWED_HOSTS=["*"], WRITE_COALESCING=coalesce):
+            self._submit_all(mode, exam, students, post_data, threads)
+
+    def _submit_all(self, mode, exam, students, post_data, threads):
+        url = f"/student/exams/{exam.exam_id}/take/"
+        clients = []
+        for student in students:
+            client = Client()
+            session = client.session
+            session["user_type"] = "student"
+            session["user_id"] = student.student_ID
+            session.save()
+            client.get(url)  # open the attempt, like a student reading the paper
+            clients.append(client)
+
+        def submit(client):
+            try:
+                return client.post(url, post_data).status_code == 302
+            except Exception:
+                return False
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(submit, clients))
+        request_time = time.perf_counter() - start
+
+        worker_time = 0.0
+        if mode == "queued":
+            start = time.perf_counter()
+            while process_queue():
+                pass
+            worker_time = time.perf_counter() - start
+
+        ok = sum(results)
+        self.stdout.write(
+            f"{mode:>7}: {ok}/{len(results)} ok | "
+            f"request path {ok / request_time:8.1f} submissions/s ({request_time * 1000 / len(results):.2f} ms each) | "
+            f"end to end {ok / (request_time + worker_time):8.1f} submissions/s"
+        )
@@ -0,0 +1,50 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app import columnar
+from app.models import Exam
+
+
+class Command(BaseCommand):
+    help = (
+        "Export answers as NumPy column files (one directory per exam under --out) for "
+        "analysis with numpy / pandas; load them with app.columnar.load(). Each run appends "
+        "only the attempts submitted since the previous one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--out", default="analytics", help="Output directory.")
+        parser.add_argument("--exam", action="append", dest="exams", metavar="EXAM_ID",
+                            help="Only this exam (repeatable). Default: every exam.")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Attempts per part file.")
+        parser.add_argument("--full", action="store_true",
+                            help="Discard earlier exports and start over, e.g. to pick up regraded answers.")
+        parser.add_argument("--lag", type=int, default=60,
+                            help="Leave out attempts submitted in the last N seconds.")
+
+    def handle(self, *args, **options):
+        exams = Exam.objects.order_by("id")
+        if options["exams"]:
+            exams = exams.filter(exam_id__in=options["exams"])
+            missing = set(options["exams"]) - set(exams.values_list("exam_id", flat=True))
+            if missing:
+                raise CommandError(f"Unknown exam(s): {', '.join(sorted(missing))}")
+
+        started = time.perf_counter()
+        total = 0
+        for exam in exams.iterator():
+            rows = columnar.export_exam(
+                exam,
+                os.path.join(options["out"], exam.exam_id),
+                chunk_size=options["chunk_size"],
+                full=options["full"],
+                lag=options["lag"],
+            )
+            if rows:
+                self.stdout.write(f"{exam.exam_id}: {rows} answer(s) appended.")
+            total += rows
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {total} answer(s) to {options['out']} in {time.perf_counter() - started:.1f}s."
+        ))
@@ -0,0 +1,227 @@
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from app.models import Choice, Exam, ExamQuestion, Instructor, Student, allocate_ids
+
+STEPS = ["login", "available_exams", "take_exam_get", "take_exam_post", "exam_result"]
+PASSWORD = "loadtest123"
+
+
+class _NoRedirect(HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class InProcessSession:
+    """
+    One simulated student talking to the WSGI app in this process.
+    """
+
+    def __init__(self):
+        self.client = Client()
+
+    def get(self, path):
+        response = self.client.get(path)
+        return response.status_code, response.get("Location", "")
+
+    def post(self, path, data):
+        response = self.client.post(path, data)
+        return response.status_code, response.get("Location", "")
+
+
+class HttpSession:
+    """
+    One simulated student talking to a running server (runserver, gunicorn, ...)
+    over HTTP, with its own cookies and CSRF token.
+    """
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.cookies = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies), _NoRedirect)
+
+    def _open(self, request):
+        try:
+            with self.opener.open(request, timeout=60) as response:
+                response.read()
+                return response.status, response.headers.get("Location", "")
+        except HTTPError as e:
+            return e.code, e.headers.get("Location", "")
+
+    def get(self, path):
+        return self._open(Request(self.base_url + path))
+
+    def post(self, path, data):
+        token = next((c.value for c in self.cookies if c.name == "csrftoken"), "")
+        if not token:
+            # the login form sets the CSRF cookie
+            self.get(reverse("universal_login"))
+            token = next((c.value for c in self.cookies if c.name == "csrftoken"), "")
+        body = urlencode(dict(data, csrfmiddlewaretoken=token)).encode()
+        return self._open(Request(
+            self.base_url + path, data=body,
+            headers={"Referer": self.base_url + path, "X-CSRFToken": token},
+        ))
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate an exam sitting: seed students and an open exam, then drive "
+        "login -> available exams -> take exam (GET, POST) -> result for every "
+        "student concurrently and report latency percentiles, throughput and errors. "
+        "Runs against the WSGI app in-process, or a running server with --url "
+        "(which must use the same database). Deletes the seeded data afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=100)
+        parser.add_argument("--questions", type=int, default=20)
+        parser.add_argument("--threads", type=int, default=8, help="Concurrent students.")
+        parser.add_argument("--url", help="Base URL of a running server, e.g. http://127.0.0.1:8000.")
+        parser.add_argument("--throttle", action="store_true",
+                            help="Keep LOGIN_THROTTLE_RATES in-process (every simulated login shares one IP). "
+                                 "With --url the server's own limits always apply.")
+        parser.add_argument("--keep", action="store_true", help="Keep the seeded exam and students.")
+
+    def handle(self, *args, **options):
+        if options["url"]:
+            try:
+                HttpSession(options["url"]).get(reverse("universal_login"))
+            except URLError as e:
+                raise CommandError(f"Cannot reach {options['url']}: {e.reason}")
+
+        run = uuid.uuid4().hex[:6]
+        instructor = Instructor.objects.create(
+            full_name="Load Test Instructor",
+            instructor_email=f"loadtest-{run}@example.com",
+            password=make_password(PASSWORD),
+        )
+        try:
+            exam, post_data = self._seed_exam(instructor, run, options["questions"])
+            students = self._seed_students(run, options["students"])
+            self.stdout.write(
+                f"Seeded {exam.exam_id} with {options['questions']} questions and {len(students)} students; "
+                f"running with {options['threads']} threads against {options['url'] or 'the in-process app'}."
+            )
+            if options["url"]:
+                self._drive(exam, students, post_data, options["threads"], lambda: HttpSession(options["url"]))
+            else:
+                overrides = {"ALLOWED_HOSTS": ["*"]}
+                if not options["throttle"]:
+                    overrides["LOGIN_THROTTLE_RATES"] = {"email": (10 ** 9, 1), "ip": (10 ** 9, 1)}
+                with override_settings(**overrides):
+                    self._drive(exam, students, post_data, options["threads"], InProcessSession)
+        finally:
+            if not options["keep"]:
+                Exam.objects.filter(created_by=instructor).delete()
+                Student.objects.filter(student_email__startswith=f"loadtest-{run}-").delete()
+                instructor.delete()
+
+    def _seed_exam(self, instructor, run, questions):
+        now = timezone.now()
+        exam = Exam.objects.create(
+            title=f"Load test {run}",
+            start_time=now - timedelta(minutes=5),
+            end_time=now + timedelta(hours=3),
+            created_by=instructor,
+        )
+        post_data = {}
+        for i in range(questions):
+            q = ExamQuestion.objects.create(exam=exam, question_text=f"Q{i + 1}", question_type="MCQ", order_no=i + 1)
+            correct = Choice.objects.create(choice_id=q, choice_text="right", is_correct=True)
+            Choice.objects.create(choice_id=q, choice_text="wrong", is_correct=False)
+            post_data[f"q_{q.id}"] = str(correct.id)
+        return exam, post_data
+
+    def _seed_students(self, run, count):
+        password = make_password(PASSWORD)  # hash once; every student logs in with it
+        return Student.objects.bulk_create([
+            Student(
+                student_ID=student_id,
+                full_name=f"Load Test Student {i}",
+                student_email=f"loadtest-{run}-{i}@example.com",
+                matric_number=f"L{run}{i:06d}",
+                password=password,
+            )
+            for i, student_id in enumerate(allocate_ids("student", count))
+        ])
+
+    def _drive(self, exam, students, post_data, threads, make_session):
+        take_url = reverse("student_take_exam", args=[exam.exam_id])
+
+        def sitting(student):
+            session = make_session()
+            timings = []
+
+            def step(name, call, expected):
+                started = time.perf_counter()
+                try:
+                    status, location = call()
+                except Exception:
+                    status, location = None, ""
+                timings.append((name, time.perf_counter() - started, status == expected))
+                return status == expected, location
+
+            try:
+                ok, _ = step("login", lambda: session.post(
+                    reverse("universal_login"), {"email": student.student_email, "password": PASSWORD}), 302)
+                if ok:
+                    step("available_exams", lambda: session.get(reverse("student_available_exams")), 200)
+                    ok, _ = step("take_exam_get", lambda: session.get(take_url), 200)
+                if ok:
+                    ok, result_url = step("take_exam_post", lambda: session.post(take_url, post_data), 302)
+                if ok and result_url:
+                    step("exam_result", lambda: session.get(result_url), 200)
+            finally:
+                connections.close_all()
+            return timings
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(sitting, students))
+        elapsed = time.perf_counter() - started
+
+        self._report(results, elapsed)
+
+    def _report(self, results, elapsed):
+        durations = defaultdict(list)
+        errors = defaultdict(int)
+        completed = 0
+        for timings in results:
+            for name, seconds, ok in timings:
+                durations[name].append(seconds)
+                errors[name] += not ok
+            completed += len(timings) == len(STEPS) and all(ok for *_, ok in timings)
+
+        self.stdout.write(f"{'step':<16}{'requests':>9}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        total = 0
+        for name in STEPS:
+            if not durations[name]:
+                continue
+            p50, p95, p99 = np.percentile(np.array(durations[name]) * 1000, [50, 95, 99])
+            total += len(durations[name])
+            self.stdout.write(
+                f"{name:<16}{len(durations[name]):>9}{errors[name]:>8}{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}"
+            )
+
+        error_count = sum(errors.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"{completed}/{len(results)} sittings completed in {elapsed:.1f}s | "
+            f"{total / elapsed:.1f} requests/s, {completed / elapsed:.2f} sittings/s | "
+            f"error rate {error_count / total if total else 0:.2%}"
+        ))
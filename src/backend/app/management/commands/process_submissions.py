@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.submissions import process_queue
+
+
+class Command(BaseCommand):
+    help = "Grade queued exam submissions (SUBMISSION_MODE = 'queued') in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200, help="Submissions per transaction.")
+        parser.add_argument("--sleep", type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--once", action="store_true", help="Exit once the queue is drained.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        total = 0
+        while True:
+            processed = process_queue(batch_size)
+            total += processed
+            if processed:
+                self.stdout.write(f"Processed {processed} submission(s) ({total} total).")
+                continue
+            if options["once"]:
+                break
+            time.sleep(options["sleep"])
+
+        self.stdout.write(self.style.SUCCESS(f"Queue drained, {total} submission(s) processed."))
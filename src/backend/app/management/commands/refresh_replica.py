@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app import replica
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary database into the read replica with SQLite's online "
+        "backup API, once or every --interval seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, help="Keep refreshing, this many seconds apart.")
+
+    def handle(self, *args, **options):
+        while True:
+            seconds = replica.refresh()
+            self.stdout.write(f"Replica refreshed in {seconds * 1000:.0f} ms.")
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,212 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import shards
+from .models import Answer, ExamAttempt, QueuedSubmission
+
+# Prometheus metrics.
+# Each worker process keeps its counters and histograms in memory (one short
+# lock per update). With METRICS_DIR set, every worker also writes a snapshot
+# to METRICS_DIR/metrics-<pid>.json at most every METRICS_FLUSH_INTERVAL
+# seconds, and a scrape of /metrics/ merges all snapshots, so the numbers cover
+# every worker. Database-derived gauges (backlogs, submission rate) are read at
+# scrape time.
+
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+HELP = {
+    "exam_http_requests_total": ("counter", "HTTP requests by URL name, method and status."),
+    "exam_http_request_duration_seconds": ("histogram", "Request latency by URL name."),
+    "exam_login_attempts_total": ("counter", "Login attempts by result."),
+    "exam_login_hash_checks_total": ("counter", "Calls to check_password."),
+    "exam_login_hash_seconds_total": ("counter", "Seconds spent in check_password."),
+    "exam_login_hash_seconds_saved_total": (
+        "counter", "Estimated check_password seconds saved by throttled logins (throttled x average check)."
+    ),
+    "exam_cache_requests_total": ("counter", "Cache lookups by cache and result (hit / miss)."),
+    "exam_write_batches_total": ("counter", "Transactions committed by the group-commit writer thread."),
+    "exam_write_jobs_total": ("counter", "Write functions run by the group-commit writer thread."),
+    "exam_submissions_last_minute": ("gauge", "Attempts submitted in the last 60 seconds."),
+    "exam_grading_backlog_answers": ("gauge", "Answers still waiting for marks (marks IS NULL)."),
+    "exam_submission_queue_backlog": ("gauge", "Queued submissions not yet graded by process_submissions."),
+}
+
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+_last_flush = 0.0
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, value=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    key = _key(name, labels)
+    with _lock:
+        row = _histograms.get(key)
+        if row is None:
+            row = _histograms[key] = [0] * (len(LATENCY_BUCKETS) + 2)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                row[i] += 1
+                break
+        row[-2] += value
+        row[-1] += 1
+
+
+def snapshot():
+    with _lock:
+        return {
+            "counters": [[name, labels, value] for (name, labels), value in _counters.items()],
+            "histograms": [[name, labels, list(row)] for (name, labels), row in _histograms.items()],
+        }
+
+
+def _metrics_dir():
+    return getattr(settings, "METRICS_DIR", None)
+
+
+def maybe_flush(force=False):
+    """
+    Write this worker's snapshot to METRICS_DIR, at most once per METRICS_FLUSH_INTERVAL.
+    """
+    global _last_flush
+    directory = _metrics_dir()
+    if not directory:
+        return
+    now = time.monotonic()
+    if not force and now - _last_flush < getattr(settings, "METRICS_FLUSH_INTERVAL", 5):
+        return
+    _last_flush = now
+
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".metrics-")
+    with os.fdopen(fd, "w") as f:
+        json.dump(snapshot(), f)
+    os.replace(tmp, os.path.join(directory, f"metrics-{os.getpid()}.json"))
+
+
+def collect():
+    """
+    Merge the snapshots of every worker (or just this process without METRICS_DIR).
+    returns: ({(name, labels): value}, {(name, labels): row})
+    """
+    directory = _metrics_dir()
+    if directory:
+        maybe_flush(force=True)
+        snapshots = []
+        for filename in os.listdir(directory):
+            if filename.startswith("metrics-") and filename.endswith(".json"):
+                try:
+                    with open(os.path.join(directory, filename)) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue  # being replaced right now; picked up on the next scrape
+    else:
+        snapshots = [snapshot()]
+
+    counters = {}
+    histograms = {}
+    for snap in snapshots:
+        for name, labels, value in snap["counters"]:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, row in snap["histograms"]:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            merged = histograms.setdefault(key, [0] * len(row))
+            for i, value in enumerate(row):
+                merged[i] += value
+    return counters, histograms
+
+
+def database_gauges():
+    since = timezone.now() - timedelta(minutes=1)
+    # summed over the attempt shards (a single pass when not sharded)
+    return {
+        "exam_submissions_last_minute": sum(
+            ExamAttempt.objects.using(alias).filter(submitted_at__gte=since).count() for alias in shards.aliases()
+        ),
+        "exam_grading_backlog_answers": sum(
+            Answer.objects.using(alias).filter(marks__isnull=True).count() for alias in shards.aliases()
+        ),
+        "exam_submission_queue_backlog": sum(
+            QueuedSubmission.objects.using(alias).filter(processed_at__isnull=True).count()
+            for alias in shards.aliases()
+        ),
+    }
+
+
+def login_throttle_savings(counters):
+    # derived from the merged counters, so the estimate covers every worker
+    checks = counters.get(("exam_login_hash_checks_total", ()), 0)
+    if not checks:
+        return {}
+    throttled = counters.get(("exam_login_attempts_total", (("result", "throttled"),)), 0)
+    average = counters.get(("exam_login_hash_seconds_total", ()), 0) / checks
+    return {"exam_login_hash_seconds_saved_total": throttled * average}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs, extra=()):
+    pairs = list(pairs) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def render():
+    """
+    returns: all metrics in the Prometheus text exposition format
+    """
+    counters, histograms = collect()
+    lines = []
+
+    def header(name):
+        kind, text = HELP[name]
+        lines.append(f"# HELP {name} {text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    for metric in sorted({name for name, _ in counters}):
+        header(metric)
+        for (name, labels), value in sorted(counters.items()):
+            if name == metric:
+                lines.append(f"{name}{_labels(labels)} {value}")
+
+    for metric in sorted({name for name, _ in histograms}):
+        header(metric)
+        for (name, labels), row in sorted(histograms.items()):
+            if name != metric:
+                continue
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, row):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(labels, [('le', '+Inf')])} {row[-1]}")
+            lines.append(f"{name}_sum{_labels(labels)} {row[-2]}")
+            lines.append(f"{name}_count{_labels(labels)} {row[-1]}")
+
+    for name, value in login_throttle_savings(counters).items():
+        header(name)
+        lines.append(f"{name} {value}")
+
+    for name, value in database_gauges().items():
+        header(name)
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,103 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.functional import SimpleLazyObject
+
+from . import metrics, replica
+from .accounts import current_account
+from .timing import finish as finish_timing, start as start_timing
+
+timing_logger = logging.getLogger("app.timing")
+
+
+class CurrentAccountMiddleware:
+    """
+    Attach the logged-in Student / Instructor as request.account. It is a lazy
+    proxy resolved on first use, at most once per request, and is falsy when
+    nobody is logged in (test it with `if request.account`, not `is None`).
+    Must come after SessionMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.account = SimpleLazyObject(lambda: current_account(request))
+        return self.get_response(request)
+
+
+class ReplicaMiddleware:
+    """
+    Read-your-writes for the read replica (app/replica.py): a request that
+    writes to the primary keeps its user on the primary for a while.
+    Must come after SessionMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return replica.track_writes(request, self.get_response)
+
+
+class ServerTimingMiddleware:
+    """
+    Measure every request: total time, SQL time and query count, template
+    render time and response size. Sent as a Server-Timing header (visible in
+    the browser devtools) and, for a sample of requests plus every slow one,
+    logged as a JSON line on the "app.timing" logger. Request counts and
+    latencies per URL name also go to the /metrics/ endpoint (app/metrics.py).
+    Goes first in MIDDLEWARE so the total covers the other middleware too.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing, token = start_timing()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(timing.execute_wrapper))
+                response = self.get_response(request)
+        finally:
+            finish_timing(token)
+        total = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.url_name if match and match.url_name else "unmatched"
+        metrics.inc("exam_http_requests_total", view=view, method=request.method, status=response.status_code)
+        metrics.observe("exam_http_request_duration_seconds", total, view=view)
+        metrics.maybe_flush()
+
+        sql_ms = timing.sql_seconds * 1000
+        template_ms = timing.template_seconds * 1000
+        total_ms = total * 1000
+        if getattr(settings, "SERVER_TIMING_HEADER", True):
+            response["Server-Timing"] = (
+                f'total;dur={total_ms:.1f}, '
+                f'db;dur={sql_ms:.1f};desc="{timing.sql_count} queries", '
+                f'tpl;dur={template_ms:.1f}'
+            )
+
+        slow = total_ms >= getattr(settings, "REQUEST_TIMING_SLOW_MS", 500)
+        if slow or random.random() < getattr(settings, "REQUEST_TIMING_SAMPLE_RATE", 0.01):
+            timing_logger.info(json.dumps({
+                "method": request.method,
+                "path": request.path,
+                "view": match.view_name if match else None,
+                "status": response.status_code,
+                "total_ms": round(total_ms, 2),
+                "sql_ms": round(sql_ms, 2),
+                "sql_count": timing.sql_count,
+                "template_ms": round(template_ms, 2),
+                "bytes": None if response.streaming else len(response.content),
+                "slow": slow,
+            }))
+        return response
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:10
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_exam_totals(apps, schema_editor):
+    Exam = apps.get_model('app', 'Exam')
+    for exam in Exam.objects.annotate(q_total=Sum('questions__marks'), q_count=Count('questions')):
+        Exam.objects.filter(pk=exam.pk).update(
+            total_marks=exam.q_total or 0,
+            question_count=exam.q_count,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_alter_student_matric_number'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='question_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='total_marks',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(backfill_exam_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_examstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('attempt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='queued_submissions', to='app.examattempt')),
+            ],
+        ),
+    ]
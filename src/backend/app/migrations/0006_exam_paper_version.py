@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_queuedsubmission'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='paper_version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:21
+
+import re
+
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    # start each sequence after the highest existing number (compared numerically,
+    # so STU1000 counts as newer than STU999)
+    IdSequence = apps.get_model('app', 'IdSequence')
+    sources = {
+        'student': (apps.get_model('app', 'Student'), 'student_ID'),
+        'instructor': (apps.get_model('app', 'Instructor'), 'instructor_ID'),
+        'exam': (apps.get_model('app', 'Exam'), 'exam_id'),
+    }
+    for name, (model, field) in sources.items():
+        last = 0
+        for value in model.objects.values_list(field, flat=True).iterator():
+            match = re.search(r'(\d+)$', value or '')
+            if match:
+                last = max(last, int(match.group(1)))
+        IdSequence.objects.update_or_create(name=name, defaults={'last_value': last})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_exam_paper_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdSequence',
+            fields=[
+                ('name', models.CharField(max_length=30, primary_key=True, serialize=False)),
+                ('last_value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_idsequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['created_by', 'created_at'], name='exam_creator_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['start_time', 'end_time'], name='exam_window_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examattempt',
+            index=models.Index(fields=['exam', 'submitted_at'], name='attempt_exam_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examattempt',
+            index=models.Index(fields=['student', 'submitted_at'], name='attempt_student_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examquestion',
+            index=models.Index(fields=['exam', 'order_no'], name='question_exam_order_idx'),
+        ),
+    ]
@@ -1,30 +1,47 @@
 from django.utils import timezone
-from django.db import models
+from django.db import connection, models, router, transaction
 from django.conf import settings
+from django.core.cache import caches
 from django.contrib.auth.hashers import make_password, check_password
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
-import uuid
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
+import math
+from . import shards
+from .grading import GRADE_LETTERS, grade_scores
 
 #Helper function
+# display formats for the custom primary keys, numbered by IdSequence
+ID_FORMATS = {
+    "student": "STU{:03d}",      # STU001
+    "instructor": "INS{:03d}",   # INS001
+    "exam": "EX-{:03d}",         # EX-001
+}
+
+def allocate_ids(kind, count=1):
+    """
+    Reserve count consecutive IDs of one kind ("student", "instructor", "exam").
+    returns: list of formatted IDs, e.g. ["STU004", "STU005"]
+    """
+    first = IdSequence.allocate(kind, count)
+    return [ID_FORMATS[kind].format(n) for n in range(first, first + count)]
+
 def generate_student_id():
-    last = Student.objects.order_by("-student_ID").first()
-    if not last:
-        return "STU001"
-    
-    last_id = int(last.student_ID.replace("STU", ""))
-    new_id = last_id + 1
-    return "STU" + str(new_id).zfill(3)
+    return allocate_ids("student")[0]
 
 def generate_instructor_id():
-    last = Instructor.objects.order_by("-instructor_ID").first()
-    if not last:
-        return "INS001"
-    
-    last_id = int(last.instructor_ID.replace("INS", ""))
-    new_id = last_id + 1
-    return "INS" + str(new_id).zfill(3)
+    return allocate_ids("instructor")[0]
+
+# cached snapshot behind request.account (app/accounts.py), dropped whenever the row changes
+ACCOUNT_KEY = "account:{}:{}"
+
+def account_cache():
+    return caches[getattr(settings, "ACCOUNT_CACHE", "default")]
+
+def forget_account(role, user_id):
+    account_cache().delete(ACCOUNT_KEY.format(role, user_id))
 
 matric_validator = RegexValidator(
     regex=r'^PPE\d{4}$',
@@ -32,6 +49,53 @@ matric_validator = RegexValidator(
 )
 
 
+class IdSequence(models.Model):
+    """
+    Last number handed out for each kind of custom ID. Numbers come from an
+    atomic UPDATE on this table, so concurrent inserts never share an ID and
+    nothing has to scan (or string-sort) the student / instructor / exam tables.
+    """
+    name = models.CharField(max_length=30, primary_key=True)
+    last_value = models.PositiveBigIntegerField(default=0)
+
+    @classmethod
+    def allocate(cls, name, count=1):
+        """
+        Reserve a block of count numbers in one statement.
+        returns: the first number of the block
+        """
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        for _ in range(2):
+            last = cls._advance(name, count)
+            if last is not None:
+                return last - count + 1
+            # first use of this sequence (normally seeded by migration 0007)
+            cls.objects.get_or_create(name=name)
+        raise RuntimeError(f"Could not allocate from sequence {name!r}")
+
+    @classmethod
+    def _advance(cls, name, count):
+        if connection.features.can_return_columns_from_insert:
+            # UPDATE ... RETURNING: bump and read back in a single round trip
+            table = connection.ops.quote_name(cls._meta.db_table)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {table} SET last_value = last_value + %s WHERE name = %s RETURNING last_value",
+                    [count, name],
+                )
+                row = cursor.fetchone()
+            return row[0] if row else None
+
+        with transaction.atomic():
+            if not cls.objects.filter(name=name).update(last_value=models.F("last_value") + count):
+                return None
+            return cls.objects.values_list("last_value", flat=True).get(name=name)
+
+    def __str__(self):
+        return f"{self.name}: {self.last_value}"
+
+
 # User models
 class Student(models.Model):
     student_ID = models.CharField(max_length=10, primary_key=True, editable=False)
@@ -48,6 +112,13 @@ class Student(models.Model):
         if not self.student_ID:
             self.student_ID = generate_student_id()
         super().save(*args, **kwargs)
+        forget_account("student", self.student_ID)
+
+    def delete(self, *args, **kwargs):
+        student_id = self.student_ID
+        result = super().delete(*args, **kwargs)
+        forget_account("student", student_id)
+        return result
         
     def __str__(self):
         return f"{self.student_ID} - {self.full_name}"
@@ -66,6 +137,13 @@ class Instructor(models.Model):
         if not self.instructor_ID:
             self.instructor_ID = generate_instructor_id()
         super().save(*args, **kwargs)
+        forget_account("instructor", self.instructor_ID)
+
+    def delete(self, *args, **kwargs):
+        instructor_id = self.instructor_ID
+        result = super().delete(*args, **kwargs)
+        forget_account("instructor", instructor_id)
+        return result
         
     def __str__(self):
         return f"{self.instructor_ID} - {self.full_name}"
@@ -81,9 +159,24 @@ class Exam(models.Model):
     end_time = models.DateTimeField()
     created_by = models.ForeignKey(Instructor, on_delete=models.CASCADE)
     
+    # denormalized from ExamQuestion, kept in sync by ExamQuestion.save/delete
+    total_marks = models.FloatField(default=0)
+    question_count = models.PositiveIntegerField(default=0)
+    # bumped on every edit of the exam, its questions or choices; keys the cached paper (app/papers.py)
+    paper_version = models.PositiveIntegerField(default=1)
+    
+    # only ever written with targeted UPDATEs, so save() must not overwrite them with stale values
+    DENORMALIZED_FIELDS = ("total_marks", "question_count", "paper_version")
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_by", "created_at"], name="exam_creator_created_idx"),  # exam_list
+            models.Index(fields=["start_time", "end_time"], name="exam_window_idx"),             # available_exams
+        ]
+    
     def clean(self):
         if self.start_time and self.end_time:
             if self.end_time <= self.start_time:
@@ -93,15 +186,37 @@ class Exam(models.Model):
     def save(self, *args, **kwargs):
         self.full_clean()
         if not self.exam_id:  
-            last_exam = Exam.objects.order_by('-id').first()
-            if last_exam:
-                last_number = int(last_exam.exam_id.split('-')[1])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-
-            self.exam_id = f"EX-{new_number:03d}"   # EX-001
+            self.exam_id = allocate_ids("exam")[0]   # EX-001
+        updating = not self._state.adding
+        if updating and not kwargs.get("update_fields"):
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.DENORMALIZED_FIELDS
+            ]
         super().save(*args, **kwargs)
+        if updating:
+            self.bump_paper_version()
+    
+    def bump_paper_version(self):
+        Exam.objects.filter(pk=self.pk).update(paper_version=models.F("paper_version") + 1)
+    
+    def refresh_totals(self):
+        """
+        Recompute total_marks and question_count from the exam's questions
+        and write them back with a single UPDATE (no save() / full_clean()).
+        """
+        totals = self.questions.aggregate(total=models.Sum("marks"), count=models.Count("id"))
+        old_total = self.total_marks
+        self.total_marks = totals["total"] or 0
+        self.question_count = totals["count"] or 0
+        Exam.objects.filter(pk=self.pk).update(
+            total_marks=self.total_marks,
+            question_count=self.question_count,
+            paper_version=models.F("paper_version") + 1,
+        )
+        # grade buckets depend on the total, so existing stats must be re-bucketed
+        if self.total_marks != old_total and ExamStats.objects.filter(exam=self).exists():
+            ExamStats.rebuild(self)
     
     @property
     def is_open(self):
@@ -121,6 +236,22 @@ class ExamQuestion(models.Model):
     order_no = models.PositiveIntegerField(default=1)
     marks = models.FloatField(default=1)  # <-- Add this line
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["exam", "order_no"], name="question_exam_order_idx"),
+        ]
+
+    # keep Exam.total_marks / Exam.question_count in step with the questions
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.exam.refresh_totals()
+
+    def delete(self, *args, **kwargs):
+        exam = self.exam
+        result = super().delete(*args, **kwargs)
+        exam.refresh_totals()
+        return result
+
     def __str__(self):
         return f"Q{self.order_no}: {self.question_text[:30]}"
     
@@ -129,6 +260,17 @@ class Choice(models.Model):   # for mcq only
     choice_text = models.CharField(max_length=255)
     is_correct = models.BooleanField(default=False)  # set which ans is correct for auto grading (mcq)
     
+    # any choice change invalidates the exam's cached paper
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        Exam.objects.filter(questions=self.choice_id_id).update(paper_version=models.F("paper_version") + 1)
+
+    def delete(self, *args, **kwargs):
+        question_id = self.choice_id_id
+        result = super().delete(*args, **kwargs)
+        Exam.objects.filter(questions=question_id).update(paper_version=models.F("paper_version") + 1)
+        return result
+    
     def __str__(self):
         return f"Choice for Q{self.choice_id.id}: {self.choice_text}"
     
@@ -142,10 +284,17 @@ class ExamAttempt(models.Model):
     submitted_at = models.DateTimeField(null=True, blank=True)
     score = models.FloatField(null=True, blank=True)
     
+    class Meta:
+        # results pages filter attempts by exam or student and sort by submission time
+        indexes = [
+            models.Index(fields=["exam", "submitted_at"], name="attempt_exam_submitted_idx"),
+            models.Index(fields=["student", "submitted_at"], name="attempt_student_submitted_idx"),
+        ]
+    
     #custom id 
     def save(self, *args, **kwargs):
         if not self.attempt_id:
-            self.attempt_id = f"ATT-{uuid.uuid4().hex[:6].upper()}"
+            self.attempt_id = shards.new_attempt_id(self.exam_id)  # ATT-XXXXXX
         super().save(*args, **kwargs)
     
     @property
@@ -187,4 +336,168 @@ class Answer(models.Model):
     
 
 
+class QueuedSubmission(models.Model):
+    """
+    Raw take_exam payload waiting for the process_submissions worker
+    (SUBMISSION_MODE = "queued"). Rows are only appended and marked processed.
+    """
+    attempt = models.ForeignKey(ExamAttempt, on_delete=models.CASCADE, related_name="queued_submissions")
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Queued submission {self.id} for {self.attempt.attempt_id}"
+
+
 # Reporting models
+
+
+class ExamStats(models.Model):
+    """
+    Running totals for the submitted attempts of one exam, updated in the same
+    transaction as the attempt score so reports need a single primary-key read.
+    """
+    exam = models.OneToOneField(Exam, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    submission_count = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    score_sq_sum = models.FloatField(default=0)
+    min_score = models.FloatField(null=True, blank=True)
+    max_score = models.FloatField(null=True, blank=True)
+    grade_buckets = models.JSONField(default=list)  # counts in GRADE_LETTERS order
+
+    @classmethod
+    def for_exam(cls, exam):
+        stats = cls.objects.filter(exam=exam).first()
+        return stats if stats else cls.rebuild(exam)
+
+    @classmethod
+    def rebuild(cls, exam):
+        """
+        Recompute every field from the exam's submitted attempts (one query).
+        """
+        # the result is written to the primary, so read it there too (not from a replica)
+        scores = list(
+            ExamAttempt.objects.using(router.db_for_write(ExamAttempt, exam=exam))
+            .filter(exam=exam, submitted_at__isnull=False, score__isnull=False)
+            .values_list("score", flat=True)
+        )
+        stats, _ = cls.objects.update_or_create(exam=exam, defaults={
+            "submission_count": len(scores),
+            "score_sum": sum(scores),
+            "score_sq_sum": sum(s * s for s in scores),
+            "min_score": min(scores, default=None),
+            "max_score": max(scores, default=None),
+            "grade_buckets": grade_scores(scores, exam.total_marks).buckets,
+        })
+        return stats
+
+    @classmethod
+    def record_score(cls, exam, old_score, new_score):
+        """
+        Move one attempt from old_score to new_score.
+        old_score is None for a new submission. Call inside transaction.atomic().
+        """
+        return cls.record_scores(exam, [(old_score, new_score)])
+
+    @classmethod
+    def record_scores(cls, exam, changes):
+        """
+        Apply many (old_score, new_score) moves for one exam with a single read and write.
+        The attempts must already be saved. Call inside transaction.atomic().
+        """
+        stats = cls.objects.select_for_update().filter(exam=exam).first()
+        if stats is None:
+            # first time we see this exam: the attempts are already saved, so count them from the table
+            return cls.rebuild(exam)
+
+        old_scores = [old for old, _ in changes if old is not None]
+        new_scores = [new for _, new in changes if new is not None]
+
+        stats.submission_count += len(new_scores) - len(old_scores)
+        stats.score_sum += sum(new_scores) - sum(old_scores)
+        stats.score_sq_sum += sum(s * s for s in new_scores) - sum(s * s for s in old_scores)
+        old_buckets = grade_scores(old_scores, exam.total_marks).buckets
+        new_buckets = grade_scores(new_scores, exam.total_marks).buckets
+        stats.grade_buckets = [b - o + n for b, o, n in zip(stats.buckets, old_buckets, new_buckets)]
+
+        if any(old in (stats.min_score, stats.max_score) for old in old_scores):
+            # the old extreme may be gone; min/max cannot be un-applied, so re-read them
+            extremes = ExamAttempt.objects.using(router.db_for_write(ExamAttempt, exam=exam)).filter(
+                exam=exam, submitted_at__isnull=False, score__isnull=False
+            ).aggregate(lo=models.Min("score"), hi=models.Max("score"))
+            stats.min_score, stats.max_score = extremes["lo"], extremes["hi"]
+        elif new_scores:
+            stats.min_score = min(new_scores + ([stats.min_score] if stats.min_score is not None else []))
+            stats.max_score = max(new_scores + ([stats.max_score] if stats.max_score is not None else []))
+
+        stats.save()
+        return stats
+
+    @property
+    def buckets(self):
+        return list(self.grade_buckets) or [0] * len(GRADE_LETTERS)
+
+    @property
+    def mean(self):
+        if not self.submission_count:
+            return None
+        return self.score_sum / self.submission_count
+
+    @property
+    def stddev(self):
+        if not self.submission_count:
+            return None
+        variance = self.score_sq_sum / self.submission_count - self.mean ** 2
+        return math.sqrt(max(variance, 0))
+
+    def __str__(self):
+        return f"Stats for {self.exam.exam_id}"
+
+
+# Sharded attempts (app/shards.py): the database cannot cascade from exams,
+# students, questions and choices in 'default' to rows in the shards.
+
+@receiver(pre_delete, sender=Exam)
+def delete_sharded_exam_attempts(sender, instance, using, **kwargs):
+    if shards.enabled() and using not in shards.aliases():
+        ExamAttempt.objects.using(shards.for_exam(instance)).filter(exam_id=instance.pk).delete()
+
+# Deleting a student takes their attempts with it (the cascade, or the receiver
+# below when sharded), which ExamStats does not see; the exams they submitted are
+# noted first and recounted once the attempts are gone.
+@receiver(pre_delete, sender=Student)
+def note_student_exams(sender, instance, using, **kwargs):
+    if shards.enabled() and using in shards.aliases():
+        return
+    instance._submitted_exam_ids = {
+        exam_id
+        for alias in shards.aliases()
+        for exam_id in ExamAttempt.objects.using(alias)
+        .filter(student_id=instance.pk, submitted_at__isnull=False)
+        .values_list("exam_id", flat=True)
+    }
+
+@receiver(post_delete, sender=Student)
+def rebuild_student_exam_stats(sender, instance, using, **kwargs):
+    exam_ids = getattr(instance, "_submitted_exam_ids", None)
+    if exam_ids:
+        for exam in Exam.objects.filter(pk__in=exam_ids):
+            ExamStats.rebuild(exam)
+
+@receiver(pre_delete, sender=Student)
+def delete_sharded_student_attempts(sender, instance, using, **kwargs):
+    if shards.enabled() and using not in shards.aliases():
+        for alias in shards.aliases():
+            ExamAttempt.objects.using(alias).filter(student_id=instance.pk).delete()
+
+@receiver(pre_delete, sender=ExamQuestion)
+def delete_sharded_question_answers(sender, instance, using, **kwargs):
+    if shards.enabled() and using not in shards.aliases():
+        Answer.objects.using(shards.for_exam(instance.exam_id)).filter(question_id=instance.pk).delete()
+
+@receiver(pre_delete, sender=Choice)
+def clear_sharded_choice_answers(sender, instance, using, **kwargs):
+    if shards.enabled() and using not in shards.aliases():
+        for alias in shards.aliases():
+            Answer.objects.using(alias).filter(selected_choice_id=instance.pk).update(selected_choice=None)
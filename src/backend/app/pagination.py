@@ -0,0 +1,120 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from . import shards
+
+# Keyset ("cursor") pagination for the long tables.
+# A page is the rows that follow (or precede) a boundary row in the sort order:
+#   WHERE submitted_at <= :t AND (submitted_at < :t OR (submitted_at = :t AND id < :id))
+#   ORDER BY submitted_at DESC, id DESC LIMIT page_size + 1
+# With an index on the sort column that is one index seek however deep the page
+# is, where OFFSET would step over every earlier row. The cursor in ?after= /
+# ?before= is the boundary row's sort values, so links stay valid while new
+# rows arrive. ?size= picks the page size, up to MAX_PAGE_SIZE.
+
+
+def page_size(request):
+    size = request.GET.get("size", "")
+    default = getattr(settings, "PAGE_SIZE", 50)
+    if not size.isdigit() or int(size) < 1:
+        return default
+    return min(int(size), getattr(settings, "MAX_PAGE_SIZE", 200))
+
+
+def encode_cursor(row, fields):
+    values = [getattr(row, field) for field in fields]
+    values = [v.isoformat() if hasattr(v, "isoformat") else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, model, fields):
+    """
+    returns: the sort values in the cursor, or None if it is missing or malformed
+    """
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(fields) or None in values:
+            return None
+        return [model._meta.get_field(field).to_python(v) for field, v in zip(fields, values)]
+    except (binascii.Error, ValueError, ValidationError):
+        return None
+
+
+def _beyond(fields, values, descending):
+    # (f1, f2, ...) past (v1, v2, ...) in the sort order, spelled out for SQLite;
+    # the extra f1 <= v1 gives the planner a range to seek to in the index
+    op = "lt" if descending else "gt"
+    condition = Q()
+    for i, field in enumerate(fields):
+        condition |= Q(**dict(zip(fields[:i], values[:i])), **{f"{field}__{op}": values[i]})
+    return Q(**{f"{fields[0]}__{op}e": values[0]}) & condition
+
+
+class Page:
+    def __init__(self, request, rows, fields, has_next, has_previous):
+        self.rows = rows
+        self.has_next = has_next and bool(rows)
+        self.has_previous = has_previous and bool(rows)
+        self._request = request
+        self._fields = fields
+
+    def _url(self, **cursor):
+        params = self._request.GET.copy()
+        params.pop("after", None)
+        params.pop("before", None)
+        params.update(cursor)
+        return "?" + params.urlencode()
+
+    @property
+    def next_url(self):
+        return self._url(after=encode_cursor(self.rows[-1], self._fields)) if self.has_next else None
+
+    @property
+    def previous_url(self):
+        return self._url(before=encode_cursor(self.rows[0], self._fields)) if self.has_previous else None
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+
+def paginate(request, queryset, fields, descending=True, across_shards=False):
+    """
+    One page of queryset, in keyset order, from the request's cursor.
+
+    fields: sort columns, none of them NULL for these rows; the last one unique (e.g. the pk)
+    descending: sort direction of every field
+    across_shards: run on every attempt shard and merge the rows (see shards.gather)
+    returns: Page
+    """
+    size = page_size(request)
+    after = decode_cursor(request.GET.get("after"), queryset.model, fields)
+    before = None if after else decode_cursor(request.GET.get("before"), queryset.model, fields)
+    boundary = after or before
+    # paging backwards reads the rows before the cursor in reverse order
+    reverse = descending if before is None else not descending
+
+    if boundary is not None:
+        queryset = queryset.filter(_beyond(fields, boundary, reverse))
+    queryset = queryset.order_by(*[("-" if reverse else "") + field for field in fields])[:size + 1]
+    if across_shards:
+        rows = shards.gather(queryset, key=lambda row: [getattr(row, f) for f in fields], reverse=reverse)
+        rows = rows[:size + 1]
+    else:
+        rows = list(queryset)
+
+    more = len(rows) > size
+    rows = rows[:size]
+    if before is not None:
+        rows.reverse()
+        return Page(request, rows, fields, has_next=True, has_previous=more)
+    return Page(request, rows, fields, has_next=more, has_previous=boundary is not None)
@@ -0,0 +1,43 @@
+from django.core.cache import cache
+
+from . import metrics
+
+# Serialized exam papers for take_exam.
+# A paper is the ordered list of questions with their choices (without the correct
+# answers). It is built once per Exam.paper_version and then served from the cache,
+# so students loading an exam do not query questions or choices.
+
+PAPER_KEY = "exam-paper:{}:v{}"
+PAPER_TIMEOUT = 60 * 60 * 6  # seconds
+
+
+def get_paper(exam):
+    key = PAPER_KEY.format(exam.pk, exam.paper_version)
+    paper = cache.get(key)
+    metrics.inc("exam_cache_requests_total", cache="paper", result="miss" if paper is None else "hit")
+    if paper is None:
+        paper = build_paper(exam)
+        cache.set(key, paper, PAPER_TIMEOUT)
+    return paper
+
+
+def build_paper(exam):
+    """
+    returns: [{"id", "question_text", "question_type", "order_no", "marks",
+               "choices": [{"id", "choice_text"}, ...]}, ...] in exam order
+    """
+    questions = exam.questions.prefetch_related("choices").order_by("order_no", "id")
+    return [
+        {
+            "id": q.id,
+            "question_text": q.question_text,
+            "question_type": q.question_type,
+            "order_no": q.order_no,
+            "marks": q.marks,
+            "choices": [
+                {"id": c.id, "choice_text": c.choice_text}
+                for c in sorted(q.choices.all(), key=lambda c: c.id)
+            ],
+        }
+        for q in questions
+    ]
@@ -0,0 +1,129 @@
+import contextvars
+import functools
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Read replica for the reporting views.
+# Views decorated with @reads_from_replica run their GET queries against the
+# REPLICA_DB alias, so the results pages do not compete with exam submissions
+# for the primary SQLite file. Locally the replica is a second SQLite file
+# refreshed from the primary with the online backup API
+# (`python manage.py refresh_replica`), so it lags by up to one refresh.
+# Read-your-writes: a logged-in user who writes to the primary reads from the
+# primary too for READ_REPLICA_STICKY_SECONDS afterwards. The marker is a short-lived
+# signed cookie rather than a session key, so writes do not also save the session
+# (a django_session row with the cached_db engine).
+
+REPLICA_DB = "replica"
+STICKY_COOKIE = "primary_until"
+
+_read_alias = contextvars.ContextVar("replica_read_alias", default=None)
+# a set shared with copies of the context (e.g. the group-commit writer thread)
+_written = contextvars.ContextVar("replica_written", default=None)
+
+
+def enabled():
+    return getattr(settings, "READ_REPLICA", False) and REPLICA_DB in settings.DATABASES
+
+
+class ReplicaRouter:
+    """
+    Reads inside @reads_from_replica go to the replica; every write goes to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        written = _written.get()
+        if written is not None and model._meta.app_label == "app":
+            written.add(model._meta.label)
+        # rows read from the replica are still written to the primary
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replica is a copy of the primary, so rows of either can be related
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA_DB}:
+            return True
+        return None
+
+
+def _sticky_seconds():
+    return getattr(settings, "READ_REPLICA_STICKY_SECONDS", 30)
+
+
+def is_sticky(request):
+    user_id = request.session.get("user_id")
+    marker = request.get_signed_cookie(STICKY_COOKIE, default=None, salt=STICKY_COOKIE, max_age=_sticky_seconds())
+    # signed for the user it was set for, so it cannot be forged or carried over to another login
+    return user_id is not None and marker == str(user_id)
+
+
+def reads_from_replica(view_func):
+    """
+    Run the GET/HEAD queries of a read-only view on the replica, unless the
+    replica is off or the user wrote something recently.
+    """
+    @functools.wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD") or not enabled() or is_sticky(request):
+            return view_func(request, *args, **kwargs)
+        token = _read_alias.set(REPLICA_DB)
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+    return wrapper
+
+
+def streaming(iterable):
+    """
+    Keep the database chosen by @reads_from_replica for an iterable that a
+    StreamingHttpResponse consumes after the view has returned.
+    """
+    alias = _read_alias.get()
+    iterator = iter(iterable)
+    while True:
+        token = _read_alias.set(alias)
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _read_alias.reset(token)
+        yield item
+
+
+def track_writes(request, get_response):
+    """
+    Call get_response and pin a logged-in user to the primary if it wrote to an app table.
+    """
+    written = set()
+    token = _written.set(written)
+    try:
+        response = get_response(request)
+    finally:
+        _written.reset(token)
+    user_id = request.session.get("user_id")
+    if written and enabled() and user_id:
+        response.set_signed_cookie(
+            STICKY_COOKIE, str(user_id), salt=STICKY_COOKIE, max_age=_sticky_seconds(),
+            httponly=True, samesite="Lax",
+        )
+    return response
+
+
+def refresh(source=DEFAULT_DB_ALIAS, target=REPLICA_DB):
+    """
+    Copy the primary into the replica with SQLite's online backup API. Readers
+    of the replica wait (busy_timeout) while the copy runs; the primary stays writable.
+    returns: seconds taken
+    """
+    started = time.perf_counter()
+    source_conn, target_conn = connections[source], connections[target]
+    source_conn.ensure_connection()
+    target_conn.ensure_connection()
+    source_conn.connection.backup(target_conn.connection)
+    return time.perf_counter() - started
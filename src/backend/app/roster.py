@@ -0,0 +1,144 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .models import Student, allocate_ids
+from .validators import password_error, student_field_error
+
+# Bulk roster import (manage.py import_students).
+# Rows are checked with the same rules as student_register, duplicates are found
+# with one set-based query per chunk, passwords are hashed in a process pool and
+# each chunk is inserted with a single bulk_create.
+
+COLUMNS = ["full_name", "email", "matric_number", "contact_number", "password"]
+REQUIRED_COLUMNS = ["full_name", "email", "matric_number", "password"]
+
+
+def row_error(row):
+    """
+    Check one roster row against the student_register rules (everything but duplicates).
+    returns: error message, or None if the row is valid
+    """
+    return student_field_error(
+        row.get("full_name"), row.get("email"), row.get("matric_number"),
+        row.get("contact_number"), row.get("password"),
+    ) or password_error(row.get("password"))
+
+
+class RosterImport:
+    """
+    Import students from an iterable of (line number, row dict) pairs.
+
+    workers: processes used for password hashing (1 = hash in this process)
+    chunk_size: rows validated, hashed and inserted together
+    dry_run: validate only, insert nothing
+
+    After run(): created, errors ([(line, message)]) and rows are filled in.
+    """
+
+    def __init__(self, workers=1, chunk_size=1000, dry_run=False):
+        self.workers = max(1, workers)
+        self.chunk_size = max(1, chunk_size)
+        self.dry_run = dry_run
+        self.rows = 0
+        self.created = 0
+        self.errors = []
+        # emails / matric numbers seen earlier in the file
+        self._emails = set()
+        self._matrics = set()
+
+    def run(self, numbered_rows):
+        pool = None
+        if self.workers > 1 and not self.dry_run:
+            pool = ProcessPoolExecutor(max_workers=self.workers, initializer=django.setup)
+        try:
+            numbered_rows = iter(numbered_rows)
+            while True:
+                chunk = list(islice(numbered_rows, self.chunk_size))
+                if not chunk:
+                    break
+                self.rows += len(chunk)
+                valid = self._validate(chunk)
+                if valid and not self.dry_run:
+                    self._insert(valid, self._hash([row["password"] for _, row in valid], pool))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return self
+
+    def _validate(self, chunk):
+        cleaned = []
+        for line, row in chunk:
+            row = {key: (row.get(key) or "").strip() for key in COLUMNS}
+            error = row_error(row)
+            if error is None and row["email"] in self._emails:
+                error = "Email appears more than once in the file."
+            if error is None and row["matric_number"] in self._matrics:
+                error = "Matric number appears more than once in the file."
+            if error:
+                self.errors.append((line, error))
+                continue
+            self._emails.add(row["email"])
+            self._matrics.add(row["matric_number"])
+            cleaned.append((line, row))
+
+        if not cleaned:
+            return []
+        # one query for every duplicate already in the database
+        taken_emails = set()
+        taken_matrics = set()
+        for email, matric in Student.objects.filter(
+            Q(student_email__in=[row["email"] for _, row in cleaned])
+            | Q(matric_number__in=[row["matric_number"] for _, row in cleaned])
+        ).values_list("student_email", "matric_number"):
+            taken_emails.add(email)
+            taken_matrics.add(matric)
+
+        valid = []
+        for line, row in cleaned:
+            if row["email"] in taken_emails:
+                self.errors.append((line, "Email is already registered."))
+            elif row["matric_number"] in taken_matrics:
+                self.errors.append((line, "Matric number already existed."))
+            else:
+                valid.append((line, row))
+        return valid
+
+    def _hash(self, passwords, pool):
+        if pool is None:
+            return [make_password(p) for p in passwords]
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+    def _insert(self, valid, hashes):
+        students = [
+            Student(
+                full_name=row["full_name"],
+                student_email=row["email"],
+                matric_number=row["matric_number"],
+                contact_number=row["contact_number"] or None,
+                password=password,
+            )
+            for (_, row), password in zip(valid, hashes)
+        ]
+        # bulk_create skips save(), so hand out the whole block of IDs up front
+        for student, student_id in zip(students, allocate_ids("student", len(students))):
+            student.student_ID = student_id
+
+        try:
+            with transaction.atomic():
+                Student.objects.bulk_create(students)
+            self.created += len(students)
+        except IntegrityError:
+            # someone registered one of these in the meantime: insert row by row
+            for (line, _), student in zip(valid, students):
+                try:
+                    with transaction.atomic():
+                        Student.objects.bulk_create([student])
+                    self.created += 1
+                except IntegrityError:
+                    self.errors.append((line, "Email or matric number is already registered."))
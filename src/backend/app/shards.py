@@ -0,0 +1,201 @@
+import contextlib
+import contextvars
+import threading
+import uuid
+import zlib
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+# Optional sharding of exam attempts.
+# With ATTEMPT_SHARDS set to a list of database aliases, ExamAttempt, Answer and
+# QueuedSubmission rows live in one of those databases, picked by a hash of the
+# exam ID; everything else stays in 'default'. Every query about one exam or one
+# attempt goes to a single shard (attempt IDs are generated so that they hash to
+# their exam's shard, so an attempt is found from its ID alone). Queries across
+# exams, e.g. a student's history, run on every shard and merge the rows in Python.
+# SQLite cannot join across files: sharded querysets must not join to exams,
+# students or questions (use related() instead of select_related()), and
+# cascades from those models are done by the pre_delete handlers in models.py.
+# Changing the number of shards moves exams between them; rows are not rebalanced.
+# Writes are not atomic across databases. Submitting, grading and processing the
+# queue commit the attempt and its answers on the shard first (writing()), and
+# only then update ExamStats in 'default' in a transaction of their own. A crash
+# or error in between leaves the running stats behind the attempts; they are not
+# reconciled automatically, so recount the exam with ExamStats.rebuild(exam).
+# The group-commit writer (app/writer.py) holds one transaction per shard around
+# a batch, commits the shards before 'default', and reports a job as stored once
+# the shards it wrote to have committed, even if 'default' then fails.
+
+SHARDED_MODELS = {"app.ExamAttempt", "app.Answer", "app.QueuedSubmission"}
+
+_scope = contextvars.ContextVar("attempt_shard", default=None)
+_recording = threading.local()
+
+
+class ShardRequired(Exception):
+    """
+    A query on a sharded model could not be routed to a shard.
+    """
+
+
+def enabled():
+    return bool(getattr(settings, "ATTEMPT_SHARDS", None))
+
+
+def aliases():
+    """
+    returns: every database holding attempts; [None] (the routers' choice) when not sharded
+    """
+    return list(settings.ATTEMPT_SHARDS) if enabled() else [None]
+
+
+def _pick(key):
+    shards = settings.ATTEMPT_SHARDS
+    return shards[zlib.crc32(str(key).encode()) % len(shards)]
+
+
+def for_exam(exam):
+    """
+    exam: Exam or exam ID
+    returns: alias of the exam's shard, or None when not sharded
+    """
+    return _pick(getattr(exam, "pk", exam)) if enabled() else None
+
+
+def for_attempt_id(attempt_id):
+    return _pick(attempt_id) if enabled() else None
+
+
+def for_attempt(attempt):
+    """
+    returns: alias of the shard holding the attempt's answers, or None when not sharded
+    """
+    if not enabled():
+        return None
+    return attempt._state.db or for_exam(attempt.exam_id)
+
+
+def new_attempt_id(exam_id):
+    """
+    returns: a fresh "ATT-XXXXXX" ID that hashes to the same shard as the exam
+    """
+    while True:
+        attempt_id = f"ATT-{uuid.uuid4().hex[:6].upper()}"
+        # with N shards this takes N tries on average
+        if not enabled() or _pick(attempt_id) == for_exam(exam_id):
+            return attempt_id
+
+
+@contextlib.contextmanager
+def scope(alias):
+    """
+    Send queries on sharded models that carry no routing hint to alias, e.g.
+    the unique checks Django runs from Answer.full_clean().
+    """
+    token = _scope.set(alias)
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+@contextlib.contextmanager
+def recording_writes():
+    """
+    Collect the shards that writing() is entered for on this thread (app/writer.py
+    uses it to tell which jobs a shard commit covers).
+    yields: a set of aliases, filled in while the block runs
+    """
+    written = _recording.aliases = set()
+    try:
+        yield written
+    finally:
+        _recording.aliases = None
+
+
+@contextlib.contextmanager
+def writing(alias):
+    """
+    scope(alias) inside a transaction on that shard. The shard commits before any
+    enclosing transaction on 'default' does; there is no atomicity across databases.
+    Just scope() when not sharded (alias None), so callers' transactions cover it.
+    """
+    written = getattr(_recording, "aliases", None)
+    if written is not None and alias is not None:
+        written.add(alias)
+    with scope(alias):
+        if alias is None:
+            yield
+        else:
+            with transaction.atomic(using=alias):
+                yield
+
+
+def gather(queryset, key=None, reverse=False):
+    """
+    Run a queryset of a sharded model on every shard and merge the rows,
+    sorted by key when given (the per-shard ordering is lost otherwise).
+    returns: list of rows
+    """
+    if not enabled():
+        return list(queryset)
+    rows = [row for alias in aliases() for row in queryset.using(alias)]
+    if key is not None:
+        rows.sort(key=key, reverse=reverse)
+    return rows
+
+
+def related(queryset, *fields):
+    """
+    select_related(*fields), or prefetch_related(*fields) when sharded, since
+    the related rows then live in another database.
+    """
+    return queryset.prefetch_related(*fields) if enabled() else queryset.select_related(*fields)
+
+
+class ShardRouter:
+    """
+    Sends sharded models to their shard. Does nothing unless ATTEMPT_SHARDS is set.
+    """
+
+    def _route(self, model, **hints):
+        if not enabled():
+            return None
+        instance = hints.get("instance")
+        if model._meta.label not in SHARDED_MODELS:
+            # e.g. attempt.exam: the rows sharded rows point to live in 'default'
+            if instance is not None and instance._state.db in settings.ATTEMPT_SHARDS:
+                return DEFAULT_DB_ALIAS
+            return None
+
+        if instance is not None:
+            if instance._state.db in settings.ATTEMPT_SHARDS:
+                return instance._state.db
+            label = instance._meta.label
+            if label == "app.ExamAttempt":
+                return for_exam(instance.exam_id)
+            if label == "app.Exam":
+                return for_exam(instance.pk)
+            attempt = instance._state.fields_cache.get("attempt")
+            if attempt is not None:
+                return for_attempt(attempt)
+        if "exam" in hints:
+            return for_exam(hints["exam"])
+        if _scope.get() is not None:
+            return _scope.get()
+        raise ShardRequired(
+            f"{model._meta.label} is sharded; pick the database with .using(shards.for_exam(...)) "
+            f"or shards.gather()."
+        )
+
+    db_for_read = _route
+    db_for_write = _route
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not enabled():
+            return None
+        databases = {DEFAULT_DB_ALIAS, *settings.ATTEMPT_SHARDS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
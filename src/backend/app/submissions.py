@@ -0,0 +1,193 @@
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from . import shards
+from .models import Answer, Choice, ExamAttempt, ExamQuestion, ExamStats, QueuedSubmission
+from .writer import run_write
+
+
+def build_answers(attempt, questions, data, choices=None, existing=None, strict=True):
+    """
+    Turn submitted form data (q_<question id> -> choice id or text) into Answer
+    objects for one attempt. Validation runs in memory (Answer.clean) so the
+    number of queries does not grow with the number of questions.
+
+    choices / existing: preloaded {choice id: Choice} and {question id: Answer};
+    looked up here when not given.
+    strict: raise on invalid answers; otherwise leave those questions unanswered.
+
+    returns: (new_answers, changed_answers, mcq_score)
+    raises: ValidationError listing every invalid question
+    """
+    if choices is None:
+        choices = {c.id: c for c in Choice.objects.filter(choice_id__exam_id=attempt.exam_id)}
+    if existing is None:
+        existing = {a.question_id: a for a in Answer.objects.using(shards.for_attempt(attempt)).filter(attempt=attempt)}
+
+    new_answers = []
+    changed_answers = []
+    errors = []
+    total_score = 0
+
+    for q in questions:
+        field_name = f"q_{q.id}"
+        answer = existing.get(q.id)
+        is_new = answer is None
+        if is_new:
+            answer = Answer(attempt=attempt, question=q)
+        else:
+            answer.question = q
+
+        marks = None
+        if q.question_type == "MCQ":
+            choice_id = str(data.get(field_name) or "")
+            selected_choice = choices.get(int(choice_id)) if choice_id.isdigit() else None
+            if selected_choice is not None and selected_choice.choice_id_id != q.id:
+                selected_choice = None
+
+            answer.selected_choice = selected_choice
+            answer.text_answer = ""
+            marks = 1 if selected_choice and selected_choice.is_correct else 0
+            answer.marks = marks
+        else:
+            answer.text_answer = data.get(field_name, "")
+            # Leave text answers ungraded until instructor reviews them.
+            answer.marks = None
+            answer.selected_choice = None
+
+        try:
+            answer.clean()
+        except ValidationError as e:
+            errors.append(f"Question {q.order_no}: {e.messages[0]}")
+            continue
+
+        total_score += marks or 0
+        (new_answers if is_new else changed_answers).append(answer)
+
+    if errors and strict:
+        raise ValidationError(errors)
+    return new_answers, changed_answers, total_score
+
+
+def save_submission(attempt, data, questions=None):
+    """
+    Grade and store a whole submission: all answers, the attempt score and
+    the exam's running stats, in one transaction. With sharding the attempt's
+    shard commits first and the stats follow separately (see app/shards.py).
+
+    returns: True if this call submitted the attempt, False if it was already submitted
+    """
+    if questions is None:
+        questions = attempt.exam.questions.order_by("order_no")
+    new_answers, changed_answers, total_score = build_answers(attempt, list(questions), data)
+    # grading and validation above only read; the writes below may be group-committed (app/writer.py)
+    return run_write(_store_submission, attempt, new_answers, changed_answers, total_score)
+
+
+def _store_submission(attempt, new_answers, changed_answers, total_score):
+    now = timezone.now()
+    with shards.writing(shards.for_attempt(attempt)):
+        # claim the attempt first, so a double-clicked Submit cannot write twice
+        claimed = ExamAttempt.objects.filter(pk=attempt.pk, submitted_at__isnull=True).update(
+            submitted_at=now,
+            score=total_score,
+        )
+        if not claimed:
+            return False
+
+        Answer.objects.bulk_create(new_answers)
+        Answer.objects.bulk_update(changed_answers, ["selected_choice", "text_answer", "marks"])
+    # Store auto-graded MCQ score only; text answers remain ungraded (marks=None)
+    attempt.submitted_at = now
+    attempt.score = total_score
+    ExamStats.record_score(attempt.exam, None, total_score)
+    return True
+
+
+def enqueue_submission(attempt, data):
+    """
+    Queued mode: durably store the raw payload and close the attempt; grading
+    happens later in process_queue (manage.py process_submissions).
+
+    returns: True if this call submitted the attempt, False if it was already submitted
+    """
+    return run_write(_store_queued, attempt, dict(data))
+
+
+def _store_queued(attempt, payload):
+    now = timezone.now()
+    with shards.writing(shards.for_attempt(attempt)):
+        claimed = ExamAttempt.objects.filter(pk=attempt.pk, submitted_at__isnull=True).update(
+            submitted_at=now,
+            score=None,
+        )
+        if not claimed:
+            return False
+        QueuedSubmission.objects.create(attempt=attempt, payload=payload)
+    attempt.submitted_at = now
+    attempt.score = None
+    return True
+
+
+def process_queue(batch_size=200):
+    """
+    Grade up to batch_size queued submissions and materialize their answers in
+    one transaction per shard, with a fixed number of queries per batch (the
+    exam stats commit after the shard when sharded, see app/shards.py).
+    Invalid answers (e.g. an MCQ left blank at the deadline) are left unanswered.
+
+    returns: number of submissions processed (up to batch_size per shard)
+    """
+    return sum(_process_batch(alias, batch_size) for alias in shards.aliases())
+
+
+def _process_batch(alias, batch_size):
+    with transaction.atomic(), shards.writing(alias):
+        items = list(
+            shards.related(
+                QueuedSubmission.objects.select_for_update()
+                .filter(processed_at__isnull=True)
+                .select_related("attempt"),
+                "attempt__exam",
+            )
+            .order_by("id")[:batch_size]
+        )
+        if not items:
+            return 0
+
+        attempts = {item.attempt_id: item.attempt for item in items}
+        exam_ids = {a.exam_id for a in attempts.values()}
+
+        questions = defaultdict(list)
+        for q in ExamQuestion.objects.filter(exam_id__in=exam_ids).order_by("order_no"):
+            questions[q.exam_id].append(q)
+        choices = {c.id: c for c in Choice.objects.filter(choice_id__exam_id__in=exam_ids)}
+        existing = defaultdict(dict)
+        for a in Answer.objects.filter(attempt_id__in=attempts):
+            existing[a.attempt_id][a.question_id] = a
+
+        new_answers = []
+        changed_answers = []
+        scores = defaultdict(list)
+        for item in items:
+            attempt = item.attempt
+            new, changed, total_score = build_answers(
+                attempt, questions[attempt.exam_id], item.payload,
+                choices=choices, existing=existing[attempt.id], strict=False,
+            )
+            new_answers += new
+            changed_answers += changed
+            attempt.score = total_score
+            scores[attempt.exam_id].append((None, total_score))
+
+        Answer.objects.bulk_create(new_answers)
+        Answer.objects.bulk_update(changed_answers, ["selected_choice", "text_answer", "marks"])
+        ExamAttempt.objects.bulk_update(list(attempts.values()), ["score"])
+        exams = {a.exam_id: a.exam for a in attempts.values()}
+        for exam_id, changes in scores.items():
+            ExamStats.record_scores(exams[exam_id], changes)
+        QueuedSubmission.objects.filter(pk__in=[item.pk for item in items]).update(processed_at=timezone.now())
+    return len(items)
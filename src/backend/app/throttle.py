@@ -0,0 +1,122 @@
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Login throttling.
+# Every login POST takes one token from a bucket for the email and one for the
+# client IP. Buckets refill continuously at LOGIN_THROTTLE_RATES; once either is
+# empty the request is rejected before check_password runs, so a flood of
+# scripted logins cannot tie up workers hashing PBKDF2.
+# Buckets live in the LOGIN_THROTTLE_CACHE cache; if that cache is unavailable a
+# small per-process LRU keeps throttling working.
+# A campus NAT puts a whole class behind one address, so the IP allowance must be
+# well above the number of students who log in at once. Behind a reverse proxy,
+# list it in LOGIN_THROTTLE_TRUSTED_PROXIES so the client address is taken from
+# X-Forwarded-For instead of the proxy's own.
+# Rejections and check_password time are counted in app/metrics.py
+# (exam_login_hash_seconds_saved_total estimates the hashing time saved).
+
+BUCKET_KEY = "throttle:login:{}:{}"
+DEFAULT_RATES = {
+    "email": (5, 300),  # 5 attempts, refilled over 5 minutes
+    "ip": (600, 60),    # 600 attempts, refilled over a minute
+}
+LOCAL_MAX_ENTRIES = 10000
+
+_lock = threading.Lock()
+_local = OrderedDict()  # fallback buckets: key -> (tokens, updated_at)
+
+
+def _cache():
+    return caches[getattr(settings, "LOGIN_THROTTLE_CACHE", "default")]
+
+
+def _rates():
+    return getattr(settings, "LOGIN_THROTTLE_RATES", DEFAULT_RATES)
+
+
+def client_ip(request):
+    """
+    The client address: REMOTE_ADDR, or when that is a trusted proxy, the last
+    X-Forwarded-For entry that is not (earlier entries can be made up by the client).
+    """
+    trusted = set(getattr(settings, "LOGIN_THROTTLE_TRUSTED_PROXIES", ()))
+    ip = request.META.get("REMOTE_ADDR")
+    if ip not in trusted:
+        return ip
+    forwarded = [a.strip() for a in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",") if a.strip()]
+    for address in reversed(forwarded):
+        if address not in trusted:
+            return address
+    return ip
+
+
+def _keys(email, ip):
+    # hash the email so odd characters can never make an invalid cache key
+    digest = hashlib.md5((email or "").strip().lower().encode()).hexdigest()
+    return {"email": BUCKET_KEY.format("email", digest), "ip": BUCKET_KEY.format("ip", ip or "-")}
+
+
+def _load(keys):
+    try:
+        return _cache().get_many(keys)
+    except Exception:
+        return {key: _local[key] for key in keys if key in _local}
+
+
+def _store(buckets, timeout):
+    try:
+        _cache().set_many(buckets, timeout)
+    except Exception:
+        for key, bucket in buckets.items():
+            _local[key] = bucket
+            _local.move_to_end(key)
+        while len(_local) > LOCAL_MAX_ENTRIES:
+            _local.popitem(last=False)
+
+
+def take(email, ip):
+    """
+    Take a token from the email and IP buckets for one login attempt.
+    Nothing is taken unless both buckets have one.
+    returns: 0 if the attempt may proceed, else seconds until it may be retried
+    """
+    rates = _rates()
+    keys = _keys(email, ip)
+    now = time.time()
+
+    with _lock:
+        stored = _load(list(keys.values()))
+        buckets = {}
+        wait = 0
+        for kind, key in keys.items():
+            capacity, period = rates[kind]
+            per_second = capacity / period
+            tokens, updated_at = stored.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * per_second)
+            if tokens < 1:
+                wait = max(wait, (1 - tokens) / per_second)
+            buckets[key] = (tokens - 1, now)
+
+        if wait:
+            return math.ceil(wait)
+        _store(buckets, max(period for _, period in rates.values()))
+    return 0
+
+
+def reset_email(email):
+    """
+    Refill the email's bucket after a successful login, so earlier typos do not count against the next one.
+    """
+    key = _keys(email, None)["email"]
+    with _lock:
+        try:
+            _cache().delete(key)
+        except Exception:
+            pass
+        _local.pop(key, None)
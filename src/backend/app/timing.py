@@ -0,0 +1,68 @@
+import contextvars
+import time
+
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+# Per-request performance counters.
+# ServerTimingMiddleware (app/middleware.py) starts a RequestTiming for each
+# request; SQL time is added by a connection execute_wrapper and template time
+# by the template backend below (set TEMPLATES BACKEND to app.timing.DjangoTemplates).
+
+_current = contextvars.ContextVar("request_timing", default=None)
+
+
+class RequestTiming:
+    __slots__ = ("sql_seconds", "sql_count", "template_seconds")
+
+    def __init__(self):
+        self.sql_seconds = 0.0
+        self.sql_count = 0
+        self.template_seconds = 0.0
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += time.perf_counter() - started
+            self.sql_count += 1
+
+
+def start():
+    """
+    returns: (timing, token); pass token to finish() when the request is done
+    """
+    timing = RequestTiming()
+    return timing, _current.set(timing)
+
+
+def finish(token):
+    _current.reset(token)
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        timing = _current.get()
+        if timing is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timing.template_seconds += time.perf_counter() - started
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """
+    The stock Django template backend, with render time added to the current RequestTiming.
+    """
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
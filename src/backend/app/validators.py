@@ -0,0 +1,47 @@
+import re
+
+# Form field rules shared by the registration / profile views and the roster import.
+
+EMAIL_REGEX = r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$"
+PASSWORD_REGEX = r"^(?=.*[A-Za-z])(?=.*\d).{8,}$"
+CONTACT_REGEX = r"^\d{10,11}$"
+MATRIC_REGEX = r"^PPE\d{4}$"
+
+
+def student_field_error(full_name, email, matric, contact, password):
+    """
+    The student_register rules for the required fields and the identity fields
+    (duplicates, the password confirmation and password_error() are up to the
+    callers, which check them in that order).
+    returns: error message, or None if the fields are valid
+    """
+    full_name, email, matric, contact, password = (
+        value or "" for value in (full_name, email, matric, contact, password)
+    )
+    if not full_name or not email or not matric or not password:
+        return "All required fields must be filled."
+    if not re.search(r"[A-Za-z]", full_name):
+        return "Full name must contain at least one letter."
+    if len(full_name) < 3:
+        return "Full name must be at least 3 characters."
+    if not re.match(EMAIL_REGEX, email):
+        return "Invalid email format."
+    if not re.match(MATRIC_REGEX, matric):
+        return "Matric number must follow the format PPE0000 (e.g., PPE1234)."
+    if contact and not contact.isdigit():
+        return "Contact number must contain only digits."
+    if contact and not (10 <= len(contact) <= 11):
+        return "Contact number must be 10–11 digits."
+    return None
+
+
+def password_error(password):
+    """
+    returns: what is wrong with a new password, or None if it is strong enough
+    """
+    password = password or ""
+    if len(password) < 8:
+        return "Password must be at least 8 characters."
+    if password.isalpha() or password.isdigit():
+        return "Password must contain both letters and numbers."
+    return None
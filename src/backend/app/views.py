@@ -1,6 +1,7 @@
 from django.shortcuts import render, get_list_or_404, redirect, get_object_or_404
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib import messages
+from django.conf import settings
 from django.utils import timezone
 from django.urls import reverse
 from django.contrib.auth.hashers import make_password
@@ -9,21 +10,29 @@ from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
 from django.shortcuts import get_object_or_404
 from django.contrib import messages
+import hmac
 import re
+import time
 from django.utils.dateparse import parse_datetime
 from django.db.models import Avg, Max, Count
 from zoneinfo import ZoneInfo
 from datetime import datetime
 import json
-from django.db.models import Avg, Max, Count
+from .grading import GRADE_LABELS, grade_scores, grade_one
+from .submissions import save_submission, enqueue_submission
+from . import shards
+from .pagination import paginate
+from .replica import reads_from_replica, streaming
+from .writer import run_write
+from . import autosave, exports, metrics, throttle
+from .papers import get_paper
+from .accounts import find_login_account
+from .validators import EMAIL_REGEX, PASSWORD_REGEX, CONTACT_REGEX, MATRIC_REGEX, password_error, student_field_error
+from django.db.models import Avg, Max, Count, Sum, Q
+from django.db import transaction
 from zoneinfo import ZoneInfo
 from datetime import datetime
 
-EMAIL_REGEX = r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$"
-PASSWORD_REGEX = r"^(?=.*[A-Za-z])(?=.*\d).{8,}$"
-CONTACT_REGEX = r"^\d{10,11}$"
-MATRIC_REGEX = r"^PPE\d{4}$"
-
 KL = ZoneInfo("Asia/Kuala_Lumpur")
 UTC = ZoneInfo("UTC")
 
@@ -61,74 +70,74 @@ def now_kl():
 
 
 #Session login
+def _login(request, role=None):
+    """
+    Shared POST handler: one query resolves the email to its account, then a
+    single password check. Unknown emails return before any hashing, so they
+    cost the same small, constant amount of work.
+    role: only accept accounts of this role ("student" / "instructor")
+    """
+    email = request.POST.get("email")
+    password = request.POST.get("password")
+
+    # rejected before any lookup or hashing once the email or IP runs out of attempts
+    wait = throttle.take(email, throttle.client_ip(request))
+    if wait:
+        metrics.inc("exam_login_attempts_total", result="throttled")
+        messages.error(request, f"Too many login attempts. Please try again in {wait} seconds.")
+        response = render(request, "login.html", {}, status=429)
+        response["Retry-After"] = str(wait)
+        return response
+
+    account = find_login_account(email)
+    if account is None or (role and account.role != role):
+        metrics.inc("exam_login_attempts_total", result="unknown_email")
+        messages.error(request, "No account found with this email.")
+        return redirect("universal_login")
+
+    started = time.perf_counter()
+    valid = check_password(password, account.password)
+    hash_seconds = time.perf_counter() - started
+    metrics.inc("exam_login_hash_checks_total")
+    metrics.inc("exam_login_hash_seconds_total", hash_seconds)
+    if not valid:
+        metrics.inc("exam_login_attempts_total", result="invalid_password")
+        messages.error(request, "Invalid password.")
+        return render(request, "login.html", {})
+
+    throttle.reset_email(email)
+    metrics.inc("exam_login_attempts_total", result="success")
+    request.session["user_type"] = account.role
+    request.session["user_id"] = account.user_id
+    return redirect("homepage")
+
 def student_login(request):
     if request.method == "POST":
-        email = request.POST.get("email")
-        password = request.POST.get("password")
-        
-        try:
-            student = Student.objects.get(student_email=email)
-        except Student.DoesNotExist:
-            messages.error(request, "No user found with this email")
-            return render(request, "login.html", {})
-        
-        if not check_password(password, student.password):
-            messages.error(request, "Invalid password")
-            return render(request, "login.html", {})
-        
-        request.session["user_type"] = "student"
-        request.session["user_id"] = student.student_ID
-        return redirect("homepage")
-    
+        return _login(request, role="student")
     return render(request, "app/login.html", {"user_type": "student"})
 
 def instructor_login(request):
     if request.method == "POST":
-        email = request.POST.get("email")
-        password = request.POST.get("password")
-
-        try:
-            instructor = Instructor.objects.get(instructor_email=email)
-        except Instructor.DoesNotExist:
-            messages.error(request, "No user found with this email")
-            return render(request, "login.html", {})
-
-        if not check_password(password, instructor.password):
-            messages.error(request, "Invalid password.")
-            return render(request, "login.html", {})
-
-        request.session["user_type"] = "instructor"
-        request.session["user_id"] = instructor.instructor_ID 
-        return redirect("homepage")
-
+        return _login(request, role="instructor")
     return render(request, "app/login.html", {"user_type": "instructor"})
 
 def universal_login(request):
     if request.method == "POST":
-        email = request.POST.get("email")
-
-        if Student.objects.filter(student_email=email).exists():
-            return student_login(request)
-
-        if Instructor.objects.filter(instructor_email=email).exists():
-            return instructor_login(request)
-
-        messages.error(request, "No account found with this email.")
-        return redirect("universal_login")
+        return _login(request)
 
     return render(request, "login.html")
 
 
 def student_required(view_func):
     def wrapper(request, *args, **kwargs):
-        if request.session.get("user_type") != "student":
+        if request.session.get("user_type") != "student" or not request.account:
             return redirect("student_login")
         return view_func(request, *args, **kwargs)
     return wrapper
 
 def instructor_required(view_func):
     def wrapper(request, *args, **kwargs):
-        if request.session.get("user_type") != "instructor":
+        if request.session.get("user_type") != "instructor" or not request.account:
             return redirect("instructor_login")
         return view_func(request, *args, **kwargs)
     return wrapper
@@ -181,42 +190,18 @@ def student_register(request):
             "contact": contact,
         }
 
-        # Required fields
-        if not full_name or not email or not matric or not password:
-            messages.error(request, "All required fields must be filled.")
-            return render(request, "app/student/register.html", context)
-        
-        if not re.search(r"[A-Za-z]", full_name):
-            messages.error(request, "Full name must contain at least one letter.")
-            return render(request, "app/student/register.html", context)
-
-
-        if len(full_name) < 3:
-            messages.error(request, "Full name must be at least 3 characters.")
-            return render(request, "app/student/register.html", context)
-
-        if not re.match(EMAIL_REGEX, email):
-            messages.error(request, "Invalid email format.")
-            return render(request, "app/student/register.html", context)
-
-        if not re.match(MATRIC_REGEX, matric):
-            messages.error(request, "Matric number must follow the format PPE0000 (e.g., PPE1234).")
+        # the same field rules as the roster import (app/validators.py), before any query
+        error = student_field_error(full_name, email, matric, contact, password)
+        if error:
+            messages.error(request, error)
             return render(request, "app/student/register.html", context)
 
-        if contact and not contact.isdigit():
-            messages.error(request, "Contact number must contain only digits.")
-            return render(request, "app/student/register.html", context)
-
-        if contact and not (10 <= len(contact) <= 11):
-            messages.error(request, "Contact number must be 10–11 digits.")
-            return render(request, "app/student/register.html", context)
-
-        # ❗ DUPLICATE EMAIL CHECK — move BEFORE password validation
+        # ❗ DUPLICATE EMAIL CHECK
         if Student.objects.filter(student_email=email).exists():
             messages.error(request, "Email is already registered.")
             return render(request, "app/student/register.html", context)
 
-        # ❗ DUPLICATE MATRIC MUST ALSO COME BEFORE PASSWORD
+        # ❗ DUPLICATE MATRIC CHECK
         if Student.objects.filter(matric_number=matric).exists():
             messages.error(request, "Matric number already existed.")
             return render(request, "app/student/register.html", context)
@@ -225,12 +210,9 @@ def student_register(request):
             messages.error(request, "Passwords do not match.")
             return render(request, "app/student/register.html", context)
 
-        if len(password) < 8:
-            messages.error(request, "Password must be at least 8 characters.")
-            return render(request, "app/student/register.html", context)
-
-        if password.isalpha() or password.isdigit():
-            messages.error(request, "Password must contain both letters and numbers.")
+        error = password_error(password)
+        if error:
+            messages.error(request, error)
             return render(request, "app/student/register.html", context)
 
         Student.objects.create(
@@ -248,9 +230,10 @@ def student_register(request):
 
 
 
+@student_required
+@reads_from_replica
 def student_profile(request):
-    student_id = request.session.get("user_id")
-    student = get_object_or_404(Student, student_ID=student_id)
+    student = request.account
 
     attempts_qs = (
         ExamAttempt.objects
@@ -258,15 +241,31 @@ def student_profile(request):
         .select_related("exam")
         .order_by("-submitted_at", "-started_at")
     )
-    submitted_qs = attempts_qs.filter(submitted_at__isnull=False)
-
-    student_stats = {
-        "total_attempts": attempts_qs.count(),
-        "submitted_count": submitted_qs.count(),
-        "avg_score": submitted_qs.aggregate(a=Avg("score"))["a"],
-        "best_score": submitted_qs.aggregate(m=Max("score"))["m"],
-        "last_submitted": submitted_qs.aggregate(m=Max("submitted_at"))["m"],
-    }
+    if shards.enabled():
+        # one query per shard; the stats come from the merged rows
+        attempts_qs = shards.gather(
+            ExamAttempt.objects.filter(student=student).prefetch_related("exam"),
+            key=lambda a: (a.submitted_at is not None, a.submitted_at or a.started_at, a.started_at),
+            reverse=True,
+        )
+        submitted = [a for a in attempts_qs if a.submitted_at is not None]
+        scores = [a.score for a in submitted if a.score is not None]
+        student_stats = {
+            "total_attempts": len(attempts_qs),
+            "submitted_count": len(submitted),
+            "avg_score": sum(scores) / len(scores) if scores else None,
+            "best_score": max(scores, default=None),
+            "last_submitted": max((a.submitted_at for a in submitted), default=None),
+        }
+    else:
+        submitted_qs = attempts_qs.filter(submitted_at__isnull=False)
+        student_stats = {
+            "total_attempts": attempts_qs.count(),
+            "submitted_count": submitted_qs.count(),
+            "avg_score": submitted_qs.aggregate(a=Avg("score"))["a"],
+            "best_score": submitted_qs.aggregate(m=Max("score"))["m"],
+            "last_submitted": submitted_qs.aggregate(m=Max("submitted_at"))["m"],
+        }
     recent_attempts = attempts_qs[:10]
 
     def ctx():
@@ -330,9 +329,9 @@ def student_profile(request):
 
 
 @instructor_required
+@reads_from_replica
 def instructor_profile(request):
-    instructor_id = request.session.get("user_id")
-    instructor = get_object_or_404(Instructor, instructor_ID=instructor_id)
+    instructor = request.account
 
     exams_qs = (
         Exam.objects
@@ -350,13 +349,32 @@ def instructor_profile(request):
         .select_related("exam", "student")
         .order_by("-submitted_at")
     )
+    if shards.enabled():
+        # the 10 latest of each shard, merged (no join to the exams in 'default')
+        exam_ids = list(exams_qs.values_list("exam_id", flat=True))
+        attempts_qs = shards.gather(
+            ExamAttempt.objects
+            .filter(exam_id__in=exam_ids, submitted_at__isnull=False)
+            .prefetch_related("exam", "student")
+            .order_by("-submitted_at")[:10],
+            key=lambda a: a.submitted_at,
+            reverse=True,
+        )
+
+    # Submission totals come from the per-exam ExamStats rows, not from ExamAttempt
+    totals = ExamStats.objects.filter(exam__created_by=instructor).aggregate(
+        count=Sum("submission_count"),
+        score_sum=Sum("score_sum"),
+        best=Max("max_score"),
+    )
+    submission_count = totals["count"] or 0
 
     instructor_stats = {
         "total_exams": exams_qs.count(),
         "open_exams": open_exam_count,
-        "total_submissions": attempts_qs.count(),
-        "avg_score": attempts_qs.aggregate(a=Avg("score"))["a"],
-        "best_score": attempts_qs.aggregate(m=Max("score"))["m"],
+        "total_submissions": submission_count,
+        "avg_score": totals["score_sum"] / submission_count if submission_count else None,
+        "best_score": totals["best"],
     }
 
     recent_submissions = attempts_qs[:10]
@@ -470,12 +488,9 @@ def instructor_register(request):
             messages.error(request, "Passwords do not match.")
             return render(request, "app/instructor/register.html", context)
 
-        if len(password) < 8:
-            messages.error(request, "Password must be at least 8 characters.")
-            return render(request, "app/instructor/register.html", context)
-
-        if password.isalpha() or password.isdigit():
-            messages.error(request, "Password must contain both letters and numbers.")
+        error = password_error(password)
+        if error:
+            messages.error(request, error)
             return render(request, "app/instructor/register.html", context)
 
         Instructor.objects.create(
@@ -494,13 +509,13 @@ def instructor_register(request):
 
 
 # Exam Module Viewset
+@student_required
 def available_exams(request):
     now = timezone.now()
     exams = Exam.objects.filter(start_time__lte=now, end_time__gte=now)
     from .models import ExamAttempt
-    student_id = request.session.get("user_id")
-    student = Student.objects.get(student_ID=student_id)
-    attempts = ExamAttempt.objects.filter(student=student, submitted_at__isnull=False)
+    student = request.account
+    attempts = shards.gather(ExamAttempt.objects.filter(student=student, submitted_at__isnull=False))
     done_exam_ids = set(attempt.exam_id for attempt in attempts)
     return render(request, "app/student/available_exams.html", {
         "exams": exams,
@@ -509,43 +524,34 @@ def available_exams(request):
     })
 
 
+@reads_from_replica
 def exam_submissions(request, exam_id):
     exam = get_object_or_404(Exam, exam_id=exam_id)
-    attempts = ExamAttempt.objects.filter(exam=exam, submitted_at__isnull=False).select_related('student').order_by('-submitted_at')
+    page = paginate(request, shards.related(
+        ExamAttempt.objects.using(shards.for_exam(exam)).filter(exam=exam, submitted_at__isnull=False), 'student'
+    ), ('submitted_at', 'id'))
 
-    # Calculate total possible marks for the exam (sum of question marks)
-    total_possible = 0
-    qs = exam.questions.all()
-    for q in qs:
-        try:
-            total_possible += float(q.marks or 0)
-        except Exception:
-            continue
+    # Total possible marks is kept on the exam row (see ExamQuestion.save)
+    total_possible = exam.total_marks
 
     # Build attempts data with computed percentage to simplify template logic
-    attempts_data = []
-    for a in attempts:
-        pct = None
-        try:
-            if a.score is not None and total_possible and total_possible > 0:
-                pct = (float(a.score) / float(total_possible)) * 100
-        except Exception:
-            pct = None
-
-        attempts_data.append({
-            "attempt": a,
-            "percent": pct,
-        })
+    attempts = page.rows
+    report = grade_scores([a.score for a in attempts], total_possible)
+    attempts_data = [
+        {"attempt": a, "percent": pct}
+        for a, pct in zip(attempts, report.percents)
+    ]
 
     return render(request, "app/instructor/exam_submissions.html", {
         "exam": exam,
         "attempts_data": attempts_data,
         "total_possible": total_possible,
+        "page": page,
     })
 
 def view_submission(request, attempt_id):
-    attempt = get_object_or_404(ExamAttempt, attempt_id=attempt_id)
-    answers = attempt.answers.select_related("question", "selected_choice")
+    attempt = get_object_or_404(ExamAttempt.objects.using(shards.for_attempt_id(attempt_id)), attempt_id=attempt_id)
+    answers = shards.related(attempt.answers.all(), "question", "selected_choice")
     user_type = request.session.get("user_type")
     # Calculate totals for template
     total_possible = sum([a.question.marks or 0 for a in answers])
@@ -557,6 +563,7 @@ def view_submission(request, attempt_id):
             return redirect('instructor_view_submission', attempt_id=attempt.attempt_id)
         # Update marks for each answer with validation (marks cannot exceed question.marks)
         errors = False
+        marked = []
         for answer in answers:
             mark = request.POST.get(f"mark_{answer.id}")
             if mark is not None and mark != "":
@@ -576,12 +583,11 @@ def view_submission(request, attempt_id):
                     errors = True
                 else:
                     answer.marks = mark_val
-                    answer.save()
+                    marked.append(answer)
 
+        # valid marks are kept even when another question had an error; one write (app/writer.py)
+        run_write(_save_marks, attempt, marked, answers, update_score=not errors)
         if not errors:
-            # Optionally, update total score
-            attempt.score = sum(a.marks or 0 for a in answers)
-            attempt.save()
             messages.success(request, "Marks saved successfully.")
             # Post-Redirect-Get: redirect back to the same page so messages are displayed here
             return redirect('instructor_view_submission', attempt_id=attempt.attempt_id)
@@ -593,17 +599,69 @@ def view_submission(request, attempt_id):
         "user_type": user_type,
     })
 
+def _save_marks(attempt, marked, answers, update_score):
+    # Answer.save() runs full_clean(), whose unique check carries no routing hint
+    with shards.writing(shards.for_attempt(attempt)):
+        for answer in marked:
+            answer.save()
+        if update_score:
+            # Optionally, update total score (and the exam's running stats with it)
+            old_score = attempt.score
+            attempt.score = sum(a.marks or 0 for a in answers)
+            attempt.save()
+    # when sharded this runs after the shard has committed (see app/shards.py)
+    if update_score:
+        if attempt.submitted and attempt.exam is not None:
+            ExamStats.record_score(attempt.exam, old_score, attempt.score)
+
+# ?sort= column of the exam list -> keyset fields (app/pagination.py); newest first by default
+EXAM_LIST_SORTS = {
+    "id": ("ID", ("id",)),
+    "title": ("Title", ("title", "id")),
+    "questions": ("Questions", ("question_count", "id")),
+    "start": ("Start", ("start_time", "id")),
+    "end": ("End", ("end_time", "id")),
+}
+
+@instructor_required
 def exam_list(request):
-    instructor_id = request.session.get("user_id")
-    instructor = Instructor.objects.get(instructor_ID=instructor_id)
-    exams = Exam.objects.filter(created_by=instructor).order_by("-created_at")
-    return render(request, "app/instructor/exam_list.html", {"exams": exams})
+    """
+    The instructor's exams a page at a time, searched (?q= in the exam ID or
+    title) and sorted (?sort=, ?dir=asc|desc) in the query, so both cover every page.
+    """
+    instructor = request.account
+    exams = Exam.objects.filter(created_by=instructor)
+    query = request.GET.get("q", "").strip()
+    if query:
+        exams = exams.filter(Q(exam_id__icontains=query) | Q(title__icontains=query))
+    sort = request.GET.get("sort")
+    fields = EXAM_LIST_SORTS[sort][1] if sort in EXAM_LIST_SORTS else ("created_at", "id")
+    descending = request.GET.get("dir") != "asc"
+    page = paginate(request, exams, fields, descending=descending)
+
+    # header links: sort by the column, or flip the direction of the current one; back to the first page
+    columns = []
+    for key, (label, _) in EXAM_LIST_SORTS.items():
+        params = request.GET.copy()
+        params.pop("after", None)
+        params.pop("before", None)
+        params["sort"] = key
+        params["dir"] = "asc" if key != sort or descending else "desc"
+        columns.append({
+            "label": label,
+            "url": "?" + params.urlencode(),
+            "icon": ("▼" if descending else "▲") if key == sort else "",
+        })
+    return render(request, "app/instructor/exam_list.html", {
+        "exams": page.rows, "page": page, "query": query, "sort": sort, "dir": request.GET.get("dir"),
+        "columns": columns,
+    })
  # url need to change later when frontend comes in
 
 
+@instructor_required
 def exam_create(request):
-    instructor_id = request.session.get("user_id")
-    instructor = Instructor.objects.get(instructor_ID=instructor_id)
+    instructor = request.account
 
     exam = None
     exam_id = request.GET.get("exam_id")
@@ -701,9 +759,9 @@ def exam_create(request):
     questions = exam.questions.all() if exam else []
     return render(request, "app/instructor/exam_form.html", {"exam": exam, "questions": questions})
 
+@instructor_required
 def exam_detail(request, exam_id):
-    instructor_id = request.session.get("user_id")
-    instructor = Instructor.objects.get(instructor_ID=instructor_id)
+    instructor = request.account
     user = instructor
     exam = get_object_or_404(Exam, exam_id=exam_id, created_by=user)
     questions = exam.questions.prefetch_related("choices").order_by("order_no")
@@ -714,112 +772,67 @@ def exam_detail(request, exam_id):
 
 
 @instructor_required
+@reads_from_replica
 def grade_distribution(request, exam_id):
-    instructor_id = request.session.get("user_id")
-    instructor = Instructor.objects.get(instructor_ID=instructor_id)
+    instructor = request.account
     exam = get_object_or_404(Exam, exam_id=exam_id, created_by=instructor)
 
-    # Fetch submitted attempts with scores
-    attempts = ExamAttempt.objects.filter(exam=exam, submitted_at__isnull=False).values_list("score", flat=True)
-    scores = [s for s in attempts if s is not None]
-
-    # Prepare grade buckets for A/B/C/D/F
-    grade_labels = ["A (90-100)", "B (80-89)", "C (70-79)", "D (60-69)", "F (<60)"]
-    grade_buckets = [0] * 5
-    for s in scores:
-        try:
-            val = float(s)
-        except Exception:
-            continue
-        # Calculate percent based on total possible marks
-        total_possible = sum((float(q.marks or 0) for q in exam.questions.all()))
-        pct = (val / total_possible) * 100 if total_possible > 0 else 0
-        if pct >= 90:
-            grade_buckets[0] += 1
-        elif pct >= 80:
-            grade_buckets[1] += 1
-        elif pct >= 70:
-            grade_buckets[2] += 1
-        elif pct >= 60:
-            grade_buckets[3] += 1
-        else:
-            grade_buckets[4] += 1
+    # Grade buckets for A/B/C/D/F, percent based on total possible marks
+    total_possible = exam.total_marks
+    stats = ExamStats.for_exam(exam)
+    grade_buckets = stats.buckets
 
     chart = {
         'type': 'bar',
-        'labels': grade_labels,
+        'labels': GRADE_LABELS,
         'data': grade_buckets,
         'title': f"Grade Distribution — {exam.title}",
     }
 
-    table_attempts = ExamAttempt.objects.filter(exam=exam, submitted_at__isnull=False).select_related('student').order_by('-submitted_at')
-
-    # Calculate total possible marks for the exam (sum of question marks)
-    total_possible = 0
-    qs = exam.questions.all()
-    for q in qs:
-        try:
-            total_possible += float(q.marks or 0)
-        except Exception:
-            continue
+    table_attempts = shards.related(
+        ExamAttempt.objects.using(shards.for_exam(exam)).filter(exam=exam, submitted_at__isnull=False), 'student'
+    ).order_by('-submitted_at')
 
     # Build attempts data with computed percentage to simplify template logic
-    attempts_data = []
-    for a in attempts:
-        pct = None
-        try:
-            if a.score is not None and total_possible and total_possible > 0:
-                pct = (float(a.score) / float(total_possible)) * 100
-        except Exception:
-            pct = None
-
-        attempts_data.append({
-            "attempt": a,
-            "percent": pct,
-        })
+    table_attempts = list(table_attempts)
+    report = grade_scores([a.score for a in table_attempts], total_possible)
+    attempts_data = [
+        {"attempt": a, "percent": pct}
+        for a, pct in zip(table_attempts, report.percents)
+    ]
 
     return render(request, "app/instructor/exam_submissions.html", {
         "exam": exam,
         "attempts_data": attempts_data,
         "total_possible": total_possible,
+        "stats": stats,
+        "chart_json": json.dumps(chart),
     })
 
 
 @instructor_required
+@reads_from_replica
 def student_history(request, student_id):
-    instructor_id = request.session.get("user_id")
-    instructor = Instructor.objects.get(instructor_ID=instructor_id)
+    instructor = request.account
 
     student = get_object_or_404(Student, student_ID=student_id)
 
     # Only include attempts for exams created by this instructor
-    attempts_qs = (
-        ExamAttempt.objects
-        .filter(student=student, submitted_at__isnull=False, exam__created_by=instructor)
-        .select_related('exam')
-        .order_by('submitted_at')
-    )
+    attempts_qs = _instructor_student_attempts(instructor, student)
 
     # For charting and table: compute percent per attempt using exam total
     attempts_list = []
     chart_labels = []
     chart_percents = []
 
-    for a in attempts_qs:
-        # compute total possible for this exam
-        total_possible = 0
-        for q in a.exam.questions.all():
-            try:
-                total_possible += float(q.marks or 0)
-            except Exception:
-                continue
+    attempts_qs = list(attempts_qs)
+    report = grade_scores(
+        [a.score for a in attempts_qs],
+        [a.exam.total_marks for a in attempts_qs],
+    )
 
-        percent = None
-        try:
-            if a.score is not None and total_possible > 0:
-                percent = (float(a.score) / float(total_possible)) * 100
-        except Exception:
-            percent = None
+    for a, percent in zip(attempts_qs, report.percents):
+        total_possible = a.exam.total_marks
 
         attempts_list.append({
             'attempt': a,
@@ -842,64 +855,72 @@ def student_history(request, student_id):
     return render(request, 'app/instructor/student_history.html', context)
 
 
+def _instructor_student_attempts(instructor, student):
+    """
+    The student's submitted attempts on this instructor's exams, oldest first.
+    """
+    if not shards.enabled():
+        return list(
+            ExamAttempt.objects
+            .filter(student=student, submitted_at__isnull=False, exam__created_by=instructor)
+            .select_related('exam')
+            .order_by('submitted_at')
+        )
+    exam_ids = list(Exam.objects.filter(created_by=instructor).values_list('exam_id', flat=True))
+    return shards.gather(
+        ExamAttempt.objects
+        .filter(student=student, submitted_at__isnull=False, exam_id__in=exam_ids)
+        .prefetch_related('exam'),
+        key=lambda a: a.submitted_at,
+    )
+
+
 @instructor_required
+@reads_from_replica
 def instructor_results(request):
     """
     Instructor results dashboard where instructor can pick an exam or a student.
     Query params: ?exam_id=EX-001 or ?student_id=STU001
     """
-    instructor_id = request.session.get("user_id")
-    instructor = Instructor.objects.get(instructor_ID=instructor_id)
+    instructor = request.account
 
     exams = Exam.objects.filter(created_by=instructor).order_by('-start_time')
 
     # students who have attempts for this instructor's exams
     student_qs = Student.objects.filter(examattempt__exam__created_by=instructor).distinct()
+    if shards.enabled():
+        student_ids = shards.gather(
+            ExamAttempt.objects.filter(exam_id__in=list(exams.values_list('exam_id', flat=True)))
+            .values_list('student_id', flat=True).distinct()
+        )
+        student_qs = Student.objects.filter(pk__in=set(student_ids))
 
     selected_exam_id = request.GET.get('exam_id')
     selected_student_id = request.GET.get('student_id')
 
     chart = None
     table_attempts = None
+    exam_stats = None
+    page = None
 
     # If exam selected -> show grade distribution (A/B/C/D/F)
     if selected_exam_id:
         exam = get_object_or_404(Exam, exam_id=selected_exam_id, created_by=instructor)
-        attempts_qs = ExamAttempt.objects.filter(exam=exam, submitted_at__isnull=False).select_related('student').order_by('-submitted_at')
+        page = paginate(request, shards.related(
+            ExamAttempt.objects.using(shards.for_exam(exam)).filter(exam=exam, submitted_at__isnull=False), 'student'
+        ), ('submitted_at', 'id'))
         
         # Calculate total possible marks for the exam
-        total_possible = sum(float(q.marks or 0) for q in exam.questions.all())
+        total_possible = exam.total_marks
         
-        # Prepare grade buckets
-        grade_labels = ["A (90-100)", "B (80-89)", "C (70-79)", "D (60-69)", "F (<60)"]
-        grade_counts = [0, 0, 0, 0, 0]
+        # Grade this page of attempts in one pass; the chart comes from the exam's running stats
+        attempts_qs = page.rows
+        report = grade_scores([att.score for att in attempts_qs], total_possible)
+        exam_stats = ExamStats.for_exam(exam)
+        grade_counts = exam_stats.buckets
         table_attempts = []
         
-        for att in attempts_qs:
-            percent = None
-            if att.score is not None and total_possible > 0:
-                try:
-                    percent = (float(att.score) / float(total_possible)) * 100
-                except Exception:
-                    percent = None
-            # Assign grade
-            grade = None
-            if percent is not None:
-                if percent >= 90:
-                    grade = "A"
-                    grade_counts[0] += 1
-                elif percent >= 80:
-                    grade = "B"
-                    grade_counts[1] += 1
-                elif percent >= 70:
-                    grade = "C"
-                    grade_counts[2] += 1
-                elif percent >= 60:
-                    grade = "D"
-                    grade_counts[3] += 1
-                else:
-                    grade = "F"
-                    grade_counts[4] += 1
+        for att, percent, grade in zip(attempts_qs, report.percents, report.grades):
             table_attempts.append({
                 'attempt_id': att.attempt_id,
                 'student': att.student,
@@ -910,7 +931,7 @@ def instructor_results(request):
             })
         chart = {
             'type': 'bar',
-            'labels': grade_labels,
+            'labels': GRADE_LABELS,
             'data': grade_counts,
             'title': f"Grade Distribution — {exam.title}",
         }
@@ -919,43 +940,20 @@ def instructor_results(request):
     # If student selected -> show student's attempts across this instructor's exams
     if selected_student_id:
         student = get_object_or_404(Student, student_ID=selected_student_id)
-        attempts_qs = (
-            ExamAttempt.objects
-            .filter(student=student, submitted_at__isnull=False, exam__created_by=instructor)
-            .select_related('exam')
-            .order_by('submitted_at')
-        )
+        attempts_qs = _instructor_student_attempts(instructor, student)
     
         labels = []
         percents = []
         rows = []
         # For bar chart: grade distribution
-        grade_labels = ["A (90-100)", "B (80-89)", "C (70-79)", "D (60-69)", "F (<60)"]
-        grade_counts = [0, 0, 0, 0, 0]
-        for a in attempts_qs:
-            total_possible = sum((float(q.marks or 0) for q in a.exam.questions.all()))
-            pct = None
-            if a.score is not None and total_possible > 0:
-                try:
-                    pct = (float(a.score) / float(total_possible)) * 100
-                except Exception:
-                    pct = None
-            if pct is not None:
-                if pct >= 90:
-                    grade = "A"
-                    grade_counts[0] += 1
-                elif pct >= 80:
-                    grade = "B"
-                    grade_counts[1] += 1
-                elif pct >= 70:
-                    grade = "C"
-                    grade_counts[2] += 1
-                elif pct >= 60:
-                    grade = "D"
-                    grade_counts[3] += 1
-                else:
-                    grade = "F"
-                    grade_counts[4] += 1
+        attempts_qs = list(attempts_qs)
+        report = grade_scores(
+            [a.score for a in attempts_qs],
+            [a.exam.total_marks for a in attempts_qs],
+        )
+        grade_counts = report.buckets
+        for a, pct, grade in zip(attempts_qs, report.percents, report.grades):
+            total_possible = a.exam.total_marks
             labels.append(f"{a.exam.exam_id} - {a.exam.title}")
             percents.append(pct if pct is not None else 0)
             rows.append({'attempt': a, 'total_possible': total_possible, 'percent': pct, 'grade': grade})
@@ -969,7 +967,7 @@ def instructor_results(request):
     
         bar_chart = {
             'type': 'bar',
-            'labels': grade_labels,
+            'labels': GRADE_LABELS,
             'data': grade_counts,
             'title': f"Grade Distribution — {student.full_name}",
         }
@@ -981,6 +979,8 @@ def instructor_results(request):
         'chart_json': json.dumps(chart) if chart else None,
         'bar_chart_json': json.dumps(bar_chart) if selected_student_id else None,
         'table_attempts': table_attempts,
+        'page': page,
+        'exam_stats': exam_stats,
         'selected_exam_id': selected_exam_id,
         'selected_student_id': selected_student_id,
     }
@@ -988,9 +988,39 @@ def instructor_results(request):
     return render(request, 'app/instructor/instructor_results.html', context)
 
 
+def _export_response(request, exams, name):
+    """
+    Stream ?rows=attempts|answers of the exams as ?format=csv|jsonl.
+    """
+    kind = request.GET.get("rows", "attempts")
+    fmt = request.GET.get("format", "csv")
+    if kind not in exports.KINDS or fmt not in exports.FORMATS:
+        return HttpResponse("Unknown export; use rows=attempts|answers and format=csv|jsonl.", status=400)
+    response = StreamingHttpResponse(
+        streaming(exports.lines(exams, kind, fmt)), content_type=exports.FORMATS[fmt]
+    )
+    response["Content-Disposition"] = f'attachment; filename="{name}-{kind}.{fmt}"'
+    return response
+
+
+@instructor_required
+@reads_from_replica
+def exam_export(request, exam_id):
+    exam = get_object_or_404(Exam, exam_id=exam_id, created_by=request.account)
+    return _export_response(request, [exam], exam.exam_id)
+
+
+@instructor_required
+@reads_from_replica
+def instructor_export(request):
+    # the exams are read once the response starts streaming
+    exams = Exam.objects.filter(created_by=request.account).order_by("created_at", "id")
+    return _export_response(request, exams, request.account.instructor_ID)
+
+
+@instructor_required
 def exam_update(request, exam_id):
-    instructor_id = request.session.get("user_id")
-    instructor = Instructor.objects.get(instructor_ID=instructor_id)
+    instructor = request.account
     exam = get_object_or_404(Exam, exam_id=exam_id, created_by=instructor)
 
     if request.method == "POST":
@@ -1035,9 +1065,9 @@ def exam_update(request, exam_id):
 
 
 
+@instructor_required
 def exam_delete(request, exam_id):
-    instructor_id = request.session.get("user_id")
-    instructor = Instructor.objects.get(instructor_ID=instructor_id)
+    instructor = request.account
     user = instructor
     exam = get_object_or_404(Exam, exam_id=exam_id, created_by=user)
     exam.delete()
@@ -1046,9 +1076,9 @@ def exam_delete(request, exam_id):
 
 
 
+@instructor_required
 def question_create(request, exam_id):
-    instructor_id = request.session.get("user_id")
-    instructor = Instructor.objects.get(instructor_ID=instructor_id)
+    instructor = request.account
     user = instructor
     exam = get_object_or_404(Exam, exam_id=exam_id, created_by=user)
 
@@ -1102,6 +1132,7 @@ def question_update(request, question_id):
 
         elif old_type == "MCQ" and new_type == "TEXT":
             question.choices.all().delete()
+            exam.bump_paper_version()
 
         elif new_type == "MCQ":
             choices_qs = list(question.choices.all())
@@ -1122,9 +1153,9 @@ def question_update(request, question_id):
 
 
 
+@instructor_required
 def question_delete(request, exam_id, question_id):
-    instructor_id = request.session.get("user_id")
-    instructor = Instructor.objects.get(instructor_ID=instructor_id)
+    instructor = request.account
     user = instructor
     exam = get_object_or_404(Exam, exam_id=exam_id, created_by=user)
     question = get_object_or_404(ExamQuestion, id=question_id, exam=exam)
@@ -1217,15 +1248,15 @@ def choice_update(request, choice_id):
     return render(request, "app/instructor/choice_form.html", {"choice": choice})
 
 
+@student_required
 def take_exam(request, exam_id):
     exam = get_object_or_404(Exam, exam_id=exam_id)
     
     if not exam.is_open:
         return render(request, "app/student/exam_closed.html", {"exam": exam})
     
-    student_id = request.session.get("user_id")
-    student = Student.objects.get(student_ID=student_id)
-    attempt, created = ExamAttempt.objects.get_or_create(exam=exam,student=student)
+    student = request.account
+    attempt, created = ExamAttempt.objects.using(shards.for_exam(exam)).get_or_create(exam=exam,student=student)
     
     if attempt.submitted:
         return render(request, "app/student/exam_done.html", {
@@ -1233,131 +1264,163 @@ def take_exam(request, exam_id):
             "attempt": attempt
         })
 
-    
-    questions = exam.questions.all().order_by("order_no")
-    
+
     if request.method == "POST":
-        total_score = 0
-        max_score = 0
-        
-        for q in questions:
-            field_name = f"q_{q.id}"
-            
-            if q.question_type == "MCQ":
-                choice_id = request.POST.get(field_name)
-                if choice_id:
-                    selected_choice = Choice.objects.filter(id=choice_id, choice_id=q).first()
-                else:
-                    selected_choice = None
-                    
-                answer, _ = Answer.objects.get_or_create(
-                    attempt=attempt,
-                    question=q,
-                    defaults={"selected_choice": selected_choice},
-                )
-                answer.selected_choice = selected_choice
-                answer.text_answer = ""
-                
-                if selected_choice and selected_choice.is_correct:
-                    answer.marks = 1
-                    total_score += 1
-                else:
-                    answer.marks = 0
-                answer.save()
-                max_score += 1
-                
+        # autosaved answers fill in anything the submitted form is missing
+        data = {**autosave.saved_answers(attempt), **request.POST.dict()}
+        data.pop("csrfmiddlewaretoken", None)
+        try:
+            if settings.SUBMISSION_MODE == "queued":
+                # store the raw payload only; manage.py process_submissions grades it
+                enqueue_submission(attempt, data)
             else:
-                text_value = request.POST.get(field_name, "")
-                answer, _ = Answer.objects.get_or_create(
-                    attempt=attempt,
-                    question=q,
-                    defaults={"text_answer": text_value},
-                )
-                answer.text_answer = text_value
-                # Leave text answers ungraded until instructor reviews them.
-                answer.marks = None
-                answer.selected_choice = None
-                answer.save()
-                
-        attempt.submitted_at = timezone.now()
-        # Store auto-graded MCQ score only; text answers remain ungraded (marks=None)
-        attempt.score = total_score
-        attempt.save()
-        return redirect("student_exam_result", attempt_id=attempt.attempt_id)
-    
+                # one transaction, constant number of queries (see app/submissions.py)
+                save_submission(attempt, data)
+            autosave.discard(attempt)
+            return redirect("student_exam_result", attempt_id=attempt.attempt_id)
+        except ValidationError as e:
+            for error in e.messages:
+                messages.error(request, error)
+            # show the form again with what was just submitted
+            saved = data
+    else:
+        # restore answers saved before a reload / browser crash
+        saved = autosave.saved_answers(attempt)
+
+    # questions and choices come from the cached paper (app/papers.py)
+    questions = [
+        dict(q, saved_value=saved.get(f"q_{q['id']}", ""))
+        for q in get_paper(exam)
+    ]
+
     return render(
         request,
         "app/student/take_exam.html",
         {"exam": exam, "questions": questions, "attempt": attempt},
     )
 
+@student_required
+def autosave_answers(request, attempt_id):
+    """
+    JSON autosave for an open attempt.
+    Body: {"answers": {"q_<question id>": "<choice id or text>", ...}} (changed answers only)
+    The answers are buffered (app/autosave.py) and written to the database in batches.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "POST required."}, status=405)
+
+    attempt = get_object_or_404(
+        shards.related(ExamAttempt.objects.using(shards.for_attempt_id(attempt_id)), "exam"),
+        attempt_id=attempt_id,
+        student=request.account,
+    )
+    if attempt.submitted or attempt.exam is None or not attempt.exam.is_open:
+        return JsonResponse({"error": "This attempt is no longer open."}, status=409)
+
+    try:
+        payload = json.loads(request.body or b"{}")
+    except ValueError:
+        return JsonResponse({"error": "Invalid JSON."}, status=400)
+
+    answers = payload.get("answers") if isinstance(payload, dict) else None
+    if not isinstance(answers, dict):
+        return JsonResponse({"error": "Expected an 'answers' object."}, status=400)
+
+    deltas = {
+        field: str(value)
+        for field, value in answers.items()
+        if field.startswith("q_") and field[2:].isdigit() and value is not None
+    }
+    buffered = autosave.buffer_answers(attempt, deltas)
+    return JsonResponse({"saved": len(deltas), "buffered": buffered})
+
+
+@student_required
 def student_results(request):
     """
-    Display a list of all completed exam attempts for the logged-in student.
+    Display the logged-in student's completed exam attempts, a page at a time (newest first).
     """
-    student_id = request.session.get("user_id")
-    student = Student.objects.get(student_ID=student_id)
-    attempts = ExamAttempt.objects.filter(student=student, submitted_at__isnull=False).select_related("exam").order_by("-submitted_at")
+    student = request.account
+    # text answers; when sharded the questions live in another database, so they are
+    # told apart by their text instead (text answers are never empty, MCQ ones always are)
+    is_text = ~Q(answers__text_answer="") if shards.enabled() else ~Q(answers__question__question_type="MCQ")
+    # awarded marks and ungraded text answers come from one aggregate, not a query per attempt
+    page = paginate(
+        request,
+        shards.related(ExamAttempt.objects.filter(student=student, submitted_at__isnull=False), "exam")
+        .annotate(
+            awarded_marks=Sum("answers__marks"),
+            ungraded_text=Count("answers", filter=Q(answers__marks__isnull=True) & is_text),
+        ),
+        ("submitted_at", "id"),
+        across_shards=True,
+    )
     # Prepare extra info for each attempt: total_possible and grade
-    awaiting_attempts = []
-    completed_attempts = []
+    attempts = page.rows
+    # queued submissions the worker has not graded yet, as (shard, attempt pk)
+    processing_ids = set()
+    for alias in shards.aliases():
+        processing_ids.update(
+            (alias, attempt_pk) for attempt_pk in QueuedSubmission.objects.using(alias)
+            .filter(attempt__in=[a for a in attempts if shards.for_attempt(a) == alias], processed_at__isnull=True)
+            .values_list("attempt_id", flat=True)
+        )
+    awarded = []
     for attempt in attempts:
-        answers = attempt.answers.select_related("question", "selected_choice")
-        total_possible = sum([a.question.marks or 0 for a in answers])
-        total_awarded = sum([a.marks or 0 for a in answers])
+        if (shards.for_attempt(attempt), attempt.id) in processing_ids:
+            awarded.append(None)
+            continue
+        # ungraded text answers mark the attempt as awaiting grading
+        awarded.append(None if attempt.ungraded_text else attempt.awarded_marks or 0)
 
-        # Detect ungraded text answers so we can mark the attempt as awaiting grading
-        has_ungraded_text = any(
-            (a.question.question_type != "MCQ") and (a.marks is None) for a in answers
-        )
+    report = grade_scores(awarded, [attempt.exam.total_marks for attempt in attempts])
 
-        if has_ungraded_text:
+    awaiting_attempts = []
+    completed_attempts = []
+    for attempt, total_awarded, percentage, grade, passed in zip(
+        attempts, awarded, report.percents, report.grades, report.passed
+    ):
+        if (shards.for_attempt(attempt), attempt.id) in processing_ids:
+            grade = "N/A"
+            status = "Processing"
+        elif total_awarded is None:
             grade = "N/A"
             status = "Awaiting Grading"
-            percentage = None
+        elif percentage is None:
+            grade = "N/A"
+            status = "N/A"
         else:
-            if total_possible > 0:
-                percent = total_awarded / total_possible
-                if percent >= 0.9:
-                    grade = "A"
-                elif percent >= 0.8:
-                    grade = "B"
-                elif percent >= 0.7:
-                    grade = "C"
-                elif percent >= 0.6:
-                    grade = "D"
-                else:
-                    grade = "F"
-                status = "Pass" if percent >= 0.5 else "Fail"
-                percentage = percent * 100
-            else:
-                grade = "N/A"
-                status = "N/A"
-                percentage = None
+            status = "Pass" if passed else "Fail"
         row = {
             "exam": attempt.exam,
             "score": attempt.score,
             "submitted_at": attempt.submitted_at,
             "attempt_id": attempt.attempt_id,
-            "total_possible": total_possible,
+            "total_possible": attempt.exam.total_marks,
             "grade": grade,
             "status": status,
             "percentage": percentage,
         }
-        if status == "Awaiting Grading":
+        if status in ("Awaiting Grading", "Processing"):
             awaiting_attempts.append(row)
         else:
             completed_attempts.append(row)
 
-    return render(request, "app/student/results.html", {"awaiting_attempts": awaiting_attempts, "completed_attempts": completed_attempts})
+    return render(request, "app/student/results.html", {
+        "awaiting_attempts": awaiting_attempts,
+        "completed_attempts": completed_attempts,
+        "page": page,
+    })
 
+@student_required
 def exam_result(request, attempt_id):
-    student_id = request.session.get("user_id")
-    student = Student.objects.get(student_ID=student_id)
-    attempt = get_object_or_404(ExamAttempt, attempt_id=attempt_id, student=student)
-    answers = attempt.answers.select_related("question", "selected_choice")
+    student = request.account
+    attempt = get_object_or_404(
+        ExamAttempt.objects.using(shards.for_attempt_id(attempt_id)), attempt_id=attempt_id, student=student
+    )
+    answers = shards.related(attempt.answers.all(), "question", "selected_choice")
     # Calculate total possible marks
-    total_possible = sum([a.question.marks for a in answers])
+    total_possible = attempt.exam.total_marks
     # Calculate total awarded marks (only counted where marks exist)
     total_awarded = sum([a.marks for a in answers if a.marks is not None])
 
@@ -1366,31 +1429,24 @@ def exam_result(request, attempt_id):
         (a.question.question_type != "MCQ") and (a.marks is None) for a in answers
     )
 
-    if has_ungraded_text:
+    if attempt.queued_submissions.filter(processed_at__isnull=True).exists():
+        # Queued submission not graded by the worker yet
+        status = "Processing"
+        grade = "N/A"
+        percentage = None
+    elif has_ungraded_text:
         # If instructor hasn't graded text answers yet, show Awaiting Grading
         status = "Awaiting Grading"
         grade = "N/A"
         percentage = None
     else:
-        # Grade calculation (example: A/B/C/D/F)
-        if total_possible > 0:
-            percent = total_awarded / total_possible
-            if percent >= 0.9:
-                grade = "A"
-            elif percent >= 0.8:
-                grade = "B"
-            elif percent >= 0.7:
-                grade = "C"
-            elif percent >= 0.6:
-                grade = "D"
-            else:
-                grade = "F"
-            status = "Pass" if percent >= 0.5 else "Fail"
-            percentage = percent * 100
-        else:
+        # Grade calculation (A/B/C/D/F, see app/grading.py)
+        percentage, grade, passed = grade_one(total_awarded, total_possible)
+        if percentage is None:
             grade = "N/A"
             status = "N/A"
-            percentage = None
+        else:
+            status = "Pass" if passed else "Fail"
 
     return render(
         request,
@@ -1406,6 +1462,20 @@ def exam_result(request, attempt_id):
         },
     )
 
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. Open to logged-in instructors and to scrapers
+    sending "Authorization: Bearer <METRICS_TOKEN>".
+    """
+    token = getattr(settings, "METRICS_TOKEN", None)
+    bearer = request.headers.get("Authorization", "")
+    is_instructor = request.session.get("user_type") == "instructor" and request.account
+    # constant-time comparison, so response timing does not give the token away
+    if not (is_instructor or (token and hmac.compare_digest(bearer.encode(), f"Bearer {token}".encode()))):
+        return HttpResponse("Forbidden", status=403, content_type="text/plain")
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
 def normalize_phone(raw: str) -> str:
     if not raw:
         return ""
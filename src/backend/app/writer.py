@@ -0,0 +1,148 @@
+import contextlib
+import contextvars
+import queue
+import sys
+import threading
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from . import metrics, shards
+
+# Group commit for SQLite writes.
+# SQLite takes one writer at a time and every commit pays for a sync, so at a
+# submission peak requests mostly wait for each other's commits. With
+# WRITE_COALESCING on, request threads hand their write functions to one writer
+# thread per process; it runs everything that queued up meanwhile in a single
+# transaction (each function in its own savepoint, so one failure does not undo
+# the others) and wakes the callers once that transaction has committed. With
+# ATTEMPT_SHARDS each shard gets a transaction of its own around the batch too;
+# the shards commit before 'default' (see app/shards.py).
+# With WRITE_COALESCING off (the default) run_write() is just transaction.atomic().
+
+_jobs = queue.SimpleQueue()
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def run_write(fn, *args, **kwargs):
+    """
+    Run fn(*args, **kwargs) in a transaction; through the writer thread when
+    WRITE_COALESCING is on. fn runs on another thread and connection there, so it
+    must only use its arguments and the ORM.
+    returns: fn's result once committed
+    raises: whatever fn raised (its writes are rolled back)
+    """
+    # a caller already inside a transaction, on any database, may hold the write lock the writer would wait for
+    in_transaction = any(connections[alias].in_atomic_block for alias in _aliases())
+    if not getattr(settings, "WRITE_COALESCING", False) or in_transaction:
+        with transaction.atomic():
+            return fn(*args, **kwargs)
+
+    job = Future()
+    _start_writer()
+    # run it in the caller's context, so context variables (e.g. app/replica.py) still apply
+    _jobs.put((job, contextvars.copy_context().run, (fn, *args), kwargs))
+    return job.result()
+
+
+def _start_writer():
+    global _thread
+    if _thread is not None and _thread.is_alive():
+        return
+    with _thread_lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_write_loop, name="sqlite-writer", daemon=True)
+            _thread.start()
+
+
+def _write_loop():
+    while True:
+        batch = [_jobs.get()]
+        # no waiting for stragglers: whatever queued during the previous commit goes next
+        while len(batch) < getattr(settings, "WRITE_BATCH_SIZE", 64):
+            try:
+                batch.append(_jobs.get_nowait())
+            except queue.Empty:
+                break
+        commit_batch(batch)
+
+
+def _shard_aliases():
+    return [alias for alias in shards.aliases() if alias is not None]
+
+
+def _aliases():
+    return [DEFAULT_DB_ALIAS, *_shard_aliases()]
+
+
+@contextlib.contextmanager
+def _savepoints(aliases):
+    # one savepoint per database, so a failing job undoes its shard writes too
+    with contextlib.ExitStack() as stack:
+        for alias in aliases:
+            stack.enter_context(transaction.atomic(using=alias))
+        yield
+
+
+def commit_batch(batch):
+    """
+    Run a batch of (future, fn, args, kwargs) jobs in one transaction per
+    database and resolve the futures after they commit. The attempt shards
+    commit first; a job whose shards committed counts as stored even if the
+    commit on 'default' (e.g. the exam stats) then fails.
+    """
+    # the writer thread's connections outlive requests, so check them like request_started does
+    for alias in _aliases():
+        connections[alias].close_if_unusable_or_obsolete()
+    shard_aliases = _shard_aliases()
+    outcomes = []
+    failed_shards = {}  # alias -> error from its commit
+    shards_committed = False
+    default_error = None
+    try:
+        with transaction.atomic():
+            blocks = []
+            try:
+                for alias in shard_aliases:
+                    blocks.append(transaction.atomic(using=alias))
+                    blocks[-1].__enter__()
+                for job, fn, args, kwargs in batch:
+                    try:
+                        with shards.recording_writes() as written, _savepoints(_aliases()):
+                            outcomes.append((job, None, fn(*args, **kwargs), written))
+                    except Exception as e:
+                        outcomes.append((job, e, None, set()))
+            except BaseException:
+                for block in reversed(blocks):
+                    block.__exit__(*sys.exc_info())
+                raise
+            # shards first: once a job's shard has committed, its submission is stored
+            for alias, block in zip(shard_aliases, blocks):
+                try:
+                    block.__exit__(None, None, None)
+                except Exception as e:
+                    failed_shards[alias] = e
+            shards_committed = True
+    except Exception as e:
+        if not shards_committed:
+            # nothing in the batch was written
+            for job, *_ in batch:
+                job.set_exception(e)
+            return
+        default_error = e
+
+    if default_error is None:
+        metrics.inc("exam_write_batches_total")
+        metrics.inc("exam_write_jobs_total", len(batch))
+    for job, error, result, written in outcomes:
+        failed = sorted(written & failed_shards.keys())
+        if error is not None:
+            job.set_exception(error)
+        elif failed:
+            job.set_exception(failed_shards[failed[0]])
+        elif default_error is not None and not written:
+            job.set_exception(default_error)
+        else:
+            job.set_result(result)
@@ -42,11 +42,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'app.middleware.CurrentAccountMiddleware',
+    'app.middleware.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -55,7 +58,8 @@ ROOT_URLCONF = 'backend.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Django's template backend plus render timing for ServerTimingMiddleware
+        'BACKEND': 'app.timing.DjangoTemplates',
         'DIRS': [BASE_DIR.parent / "frontend" / "templates"],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -74,13 +78,184 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite tuning, applied to every new connection through OPTIONS init_command.
+# WAL lets readers run alongside the single writer, and with WAL synchronous=NORMAL
+# only fsyncs at checkpoints (a power cut can lose the last commits, never corrupt
+# the file). Writers queue for up to busy_timeout ms instead of failing with
+# "database is locked"; transaction_mode IMMEDIATE takes the write lock at BEGIN so
+# two transactions cannot deadlock upgrading from a read lock (which busy_timeout
+# does not help with). Compare with `python manage.py bench_sqlite`.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,       # ms
+    'mmap_size': 128 * 2 ** 20,  # bytes of the file read through mmap
+    'cache_size': -20000,       # page cache per connection; negative means KiB
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # keep connections open between requests (per thread), checked before reuse
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Read replica for the reporting views (app/replica.py): a copy of db.sqlite3 kept up
+# to date by `python manage.py refresh_replica --interval 10`. With READ_REPLICA off
+# every query uses 'default'. Keep READ_REPLICA_STICKY_SECONDS above the refresh
+# interval, so users who just wrote keep reading from the primary until the copy has it.
+DATABASES['replica'] = {**DATABASES['default'], 'NAME': BASE_DIR / 'db-replica.sqlite3'}
+READ_REPLICA = False
+READ_REPLICA_STICKY_SECONDS = 30
+
+# Sharded attempts (app/shards.py): with ATTEMPT_SHARDS = ['attempts_0', 'attempts_1'],
+# ExamAttempt / Answer / QueuedSubmission rows are spread over those databases by exam,
+# so the answers of past semesters do not slow down the current one. Create a shard
+# with `python manage.py migrate --database attempts_0`. The shards hold copies of the
+# schema only, so foreign keys to exams / students are not enforced there. Existing
+# rows are not moved when this is switched on or the number of shards changes.
+ATTEMPT_SHARDS = []
+for _shard in range(2):
+    DATABASES[f'attempts_{_shard}'] = {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / f'db-attempts-{_shard}.sqlite3',
+        'OPTIONS': {
+            **DATABASES['default']['OPTIONS'],
+            'init_command': DATABASES['default']['OPTIONS']['init_command'] + ';PRAGMA foreign_keys=OFF',
+        },
+    }
+
+DATABASE_ROUTERS = ['app.shards.ShardRouter', 'app.replica.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Answer autosave buffer (app/autosave.py). Local memory is per process, so a submission
+    # handled by another worker would miss the answers buffered here: when running several
+    # worker processes switch to redis or memcached (`manage.py check --deploy` warns
+    # otherwise). It relies on add() / incr() being atomic, which FileBasedCache does not
+    # guarantee, e.g.
+    # 'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379/1'
+    'autosave': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'autosave',
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+    # Session cache for SESSION_MODE 'cached_db' / 'cache'. Local memory is per process: with
+    # several workers a logout only reaches the worker that handled it, so switch to redis /
+    # memcached (`manage.py check --deploy` warns otherwise) or use SESSION_MODE 'db'.
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sessions',
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+}
+
+AUTOSAVE_CACHE = 'autosave'
+AUTOSAVE_FLUSH_INTERVAL = 60  # seconds between batched writes of buffered answers
+
+# request.account snapshots (app/accounts.py). The cache must be shared by every worker
+# process (redis / memcached), or a renamed / deleted account is only forgotten by the
+# worker that changed it; `manage.py check --deploy` warns otherwise. 0 turns them off.
+ACCOUNT_CACHE = 'default'
+ACCOUNT_CACHE_TIMEOUT = 300  # seconds
+
+# Login throttling (app/throttle.py): token buckets of (attempts, seconds to refill them all).
+# Use a cache shared by all worker processes so the limits are global.
+LOGIN_THROTTLE_CACHE = 'default'
+LOGIN_THROTTLE_RATES = {
+    'email': (5, 300),
+    # shared by everyone behind one NAT (a campus network): keep it well above class size
+    'ip': (600, 60),
+}
+# Reverse proxies whose X-Forwarded-For names the client, e.g. ['127.0.0.1'].
+LOGIN_THROTTLE_TRUSTED_PROXIES = []
+
+
+# Request instrumentation (app.middleware.ServerTimingMiddleware)
+SERVER_TIMING_HEADER = True        # add a Server-Timing header to every response
+REQUEST_TIMING_SAMPLE_RATE = 0.01  # share of requests logged on the "app.timing" logger
+REQUEST_TIMING_SLOW_MS = 500       # requests at least this slow are always logged
+
+# Prometheus metrics at /metrics/ (app/metrics.py), for instructors or a scraper sending
+# "Authorization: Bearer <METRICS_TOKEN>". With several worker processes set METRICS_DIR to
+# a directory they all can write: each worker flushes its counters there at most every
+# METRICS_FLUSH_INTERVAL seconds and a scrape merges them. Unset, a scrape only sees the
+# worker that answers it.
+METRICS_TOKEN = None
+METRICS_DIR = None
+METRICS_FLUSH_INTERVAL = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'app.timing': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+
+# Sessions
+# The session only holds user_type / user_id (flash messages use cookie storage), so it
+# does not need to live in the SQLite file that takes the exam submissions.
+# "db":             django_session table, read on every request (Django's default)
+# "cached_db":      read from the 'sessions' cache, written through to the table on change
+# "cache":          'sessions' cache only; logins are lost when the cache is cleared
+#                   (both need a 'sessions' cache shared by every worker process)
+# "file":           one file per session under SESSION_FILE_PATH
+# "signed_cookies": no server-side storage; a logout cannot revoke a copied cookie
+# Compare them with `python manage.py bench_sessions`.
+SESSION_MODE = 'cached_db'
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'file': 'django.contrib.sessions.backends.file',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_ENGINES[SESSION_MODE]
+SESSION_CACHE_ALIAS = 'sessions'
+SESSION_FILE_PATH = None  # None = the system temp directory
+
+
+# Exam submissions
+# "inline": take_exam grades and stores answers during the request.
+# "queued": take_exam only stores the raw payload; run `python manage.py process_submissions`
+#           to grade queued submissions in batches.
+SUBMISSION_MODE = 'inline'
+
+# Group commit (app/writer.py): submission and marking writes go through one writer
+# thread per process, which commits up to WRITE_BATCH_SIZE of them per transaction.
+# Pays off when commits are sync-bound (synchronous=FULL, slow disks) and many requests
+# write at once; with WAL + synchronous=NORMAL commits are cheap and the hand-off costs
+# more than it saves. Off, each request commits on its own.
+WRITE_COALESCING = False
+WRITE_BATCH_SIZE = 64
+
+# Rows per page of the submissions, exam list and results tables (app/pagination.py);
+# ?size= asks for another size, up to MAX_PAGE_SIZE.
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# CSV / JSONL exports (app/exports.py) read and write this many rows at a time.
+EXPORT_CHUNK_SIZE = 2000
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -0,0 +1,10 @@
+import pytest
+from django.core.cache import caches
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # cache keys use primary keys, and the test database hands the same ones out again
+    for cache in caches.all():
+        cache.clear()
+    yield
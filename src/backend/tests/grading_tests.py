@@ -0,0 +1,58 @@
+import numpy as np
+
+from app.grading import GRADE_LABELS, grade_scores, grade_one
+
+# Grading engine unit tests (no database needed)
+
+
+def test_grade_scores_bands_and_buckets():
+    report = grade_scores([95, 85, 75, 65, 40], 100)
+
+    assert report.grades == ["A", "B", "C", "D", "F"]
+    assert report.percents == [95.0, 85.0, 75.0, 65.0, 40.0]
+    assert report.passed == [True, True, True, True, False]
+    assert report.buckets == [1, 1, 1, 1, 1]
+    assert len(report.buckets) == len(GRADE_LABELS)
+
+
+def test_grade_scores_band_edges():
+    report = grade_scores([9, 8, 7, 6, 5, 4.99], 10)
+
+    assert report.grades == ["A", "B", "C", "D", "F", "F"]
+    assert report.passed == [True, True, True, True, True, False]
+
+
+def test_grade_scores_per_row_totals():
+    report = grade_scores([1, 1], [2, 1])
+
+    assert report.percents == [50.0, 100.0]
+    assert report.grades == ["F", "A"]
+
+
+def test_grade_scores_skips_ungraded_and_empty_exams():
+    report = grade_scores([None, 5, 3], [10, 0, 10])
+
+    assert report.percents == [None, None, 30.0]
+    assert report.grades == [None, None, "F"]
+    assert report.passed == [None, None, False]
+    assert report.buckets == [0, 0, 0, 0, 1]
+
+
+def test_grade_scores_empty_input():
+    report = grade_scores([], 10)
+
+    assert report.percents == []
+    assert report.buckets == [0, 0, 0, 0, 0]
+
+
+def test_grade_scores_large_cohort():
+    scores = np.linspace(0, 100, 20000)
+    report = grade_scores(scores, 100)
+
+    assert len(report.grades) == 20000
+    assert sum(report.buckets) == 20000
+
+
+def test_grade_one():
+    assert grade_one(7, 10) == (70.0, "C", True)
+    assert grade_one(None, 10) == (None, None, None)
@@ -35,7 +35,36 @@ def test_student_custom_id_generation():
 
     assert s1.student_ID == "STU001"
     assert s2.student_ID == "STU002"
-    
+
+@pytest.mark.django_db
+def test_id_block_reservation_and_rollover():
+    assert allocate_ids("student", 3) == ["STU001", "STU002", "STU003"]
+    assert generate_student_id() == "STU004"
+
+    # past 999 the numbers keep growing instead of sorting STU1000 before STU999
+    IdSequence.objects.filter(name="student").update(last_value=998)
+    assert allocate_ids("student", 2) == ["STU999", "STU1000"]
+    assert generate_student_id() == "STU1001"
+
+@pytest.mark.django_db
+def test_id_sequence_created_on_first_use():
+    IdSequence.objects.filter(name="exam").delete()
+    assert IdSequence.allocate("exam") == 1
+    assert IdSequence.allocate("exam", 5) == 2
+    assert IdSequence.objects.get(name="exam").last_value == 6
+
+@pytest.mark.django_db
+def test_sqlite_connection_pragmas(settings):
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        for name in ("synchronous", "busy_timeout", "cache_size"):
+            cursor.execute(f"PRAGMA {name}")
+            value = cursor.fetchone()[0]
+            expected = {"synchronous": 1}.get(name, settings.SQLITE_PRAGMAS[name])  # NORMAL reads back as 1
+            assert value == expected, name
+    assert connection.transaction_mode == "IMMEDIATE"
+
 @pytest.mark.django_db
 def test_student_duplicated_email_registered():
     Student.objects.create(
@@ -600,7 +629,204 @@ def test_answer_requires_some_response():
     with pytest.raises(Exception):
         answer.full_clean()
 
+# ----Exam denormalized totals----
+@pytest.mark.django_db
+def test_exam_total_marks_follow_question_changes():
+    teacher = Instructor.objects.create(full_name="Test Teacher",instructor_email="t@example.com",password="pass")
+    exam = Exam.objects.create(
+        title="Exam",
+        description="desc",
+        start_time=timezone.now(),
+        end_time=timezone.now() + timedelta(hours=1),
+        created_by=teacher
+    )
+    assert exam.total_marks == 0
+    assert exam.question_count == 0
+
+    q1 = ExamQuestion.objects.create(exam=exam, question_text="Q1", question_type="MCQ", marks=2)
+    q2 = ExamQuestion.objects.create(exam=exam, question_text="Q2", question_type="TEXT", marks=3)
+    exam.refresh_from_db()
+    assert exam.total_marks == 5
+    assert exam.question_count == 2
+
+    q2.marks = 10
+    q2.save()
+    exam.refresh_from_db()
+    assert exam.total_marks == 12
+
+    q1.delete()
+    exam.refresh_from_db()
+    assert exam.total_marks == 10
+    assert exam.question_count == 1
+
+# ----ExamStats running totals----
+@pytest.mark.django_db
+def test_exam_stats_record_and_regrade():
+    teacher = Instructor.objects.create(full_name="Test Teacher",instructor_email="t@example.com",password="pass")
+    exam = Exam.objects.create(
+        title="Exam",
+        description="desc",
+        start_time=timezone.now(),
+        end_time=timezone.now() + timedelta(hours=1),
+        created_by=teacher
+    )
+    ExamQuestion.objects.create(exam=exam, question_text="Q1", question_type="TEXT", marks=10)
+    exam.refresh_from_db()
+
+    scores = [9, 5, 7]
+    for i, score in enumerate(scores):
+        student = Student.objects.create(full_name=f"S{i}", student_email=f"s{i}@example.com", matric_number=f"A00{i}", password="pass")
+        attempt = ExamAttempt.objects.create(exam=exam, student=student, submitted_at=timezone.now(), score=score)
+        ExamStats.record_score(exam, None, score)
+
+    stats = ExamStats.objects.get(exam=exam)
+    assert stats.submission_count == 3
+    assert stats.mean == 7
+    assert round(stats.stddev, 4) == round((8 / 3) ** 0.5, 4)
+    assert (stats.min_score, stats.max_score) == (5, 9)
+    assert stats.buckets == [1, 0, 1, 0, 1]
+
+    # regrade the last attempt (7 -> 10) like view_submission does
+    attempt.score = 10
+    attempt.save()
+    stats = ExamStats.record_score(exam, 7, 10)
+    assert stats.submission_count == 3
+    assert stats.max_score == 10
+    assert stats.buckets == [2, 0, 0, 0, 1]
+
+    # incremental state matches a full rebuild
+    rebuilt = ExamStats.rebuild(exam)
+    assert (rebuilt.score_sum, rebuilt.score_sq_sum, rebuilt.buckets) == (stats.score_sum, stats.score_sq_sum, stats.buckets)
+
+
+@pytest.mark.django_db
+def test_exam_stats_rebucket_when_total_changes():
+    teacher = Instructor.objects.create(full_name="Test Teacher",instructor_email="t@example.com",password="pass")
+    student = Student.objects.create(full_name="Stu",student_email="stu@example.com",matric_number="A123",password="pass")
+    exam = Exam.objects.create(
+        title="Exam",
+        description="desc",
+        start_time=timezone.now(),
+        end_time=timezone.now() + timedelta(hours=1),
+        created_by=teacher
+    )
+    question = ExamQuestion.objects.create(exam=exam, question_text="Q1", question_type="TEXT", marks=10)
+    ExamAttempt.objects.create(exam=exam, student=student, submitted_at=timezone.now(), score=9)
+    assert ExamStats.for_exam(exam).buckets == [1, 0, 0, 0, 0]
+
+    question.marks = 20
+    question.save()
+    assert ExamStats.objects.get(exam=exam).buckets == [0, 0, 0, 0, 1]
+
+
+@pytest.mark.django_db
+def test_exam_stats_follow_student_delete():
+    teacher = Instructor.objects.create(full_name="Test Teacher",instructor_email="t@example.com",password="pass")
+    exam = Exam.objects.create(
+        title="Exam",
+        description="desc",
+        start_time=timezone.now(),
+        end_time=timezone.now() + timedelta(hours=1),
+        created_by=teacher
+    )
+    ExamQuestion.objects.create(exam=exam, question_text="Q1", question_type="TEXT", marks=10)
+    students = []
+    for i, score in enumerate([9, 4]):
+        students.append(Student.objects.create(full_name=f"S{i}", student_email=f"s{i}@example.com", matric_number=f"A00{i}", password="pass"))
+        ExamAttempt.objects.create(exam=exam, student=students[-1], submitted_at=timezone.now(), score=score)
+    stats = ExamStats.for_exam(exam)
+    assert (stats.submission_count, stats.max_score) == (2, 9)
+
+    # the attempt goes with the student (cascade), and so does its score
+    students[0].delete()
+    stats = ExamStats.objects.get(exam=exam)
+    assert (stats.submission_count, stats.score_sum, stats.min_score, stats.max_score) == (1, 4, 4, 4)
+    assert stats.buckets == [0, 0, 0, 0, 1]
+
 #----------------------------------------------
 #-------------End  of exam module test---------
 #----------------------------------------------
 
+
+
+@pytest.mark.django_db
+def test_columnar_export_appends_since_watermark(tmp_path):
+    import numpy as np
+    from io import StringIO
+    from django.core.management import call_command
+    from app import columnar
+
+    teacher = Instructor.objects.create(full_name="Test Teacher",instructor_email="t@example.com",password="pass")
+    students = [
+        Student.objects.create(full_name=f"Stu {i}",student_email=f"stu{i}@example.com",matric_number=f"A{i:03d}",password="pass")
+        for i in range(4)
+    ]
+    exams = []
+    for title in ["Exam 1", "Exam 2"]:
+        exam = Exam.objects.create(title=title, start_time=timezone.now(), end_time=timezone.now() + timedelta(hours=1), created_by=teacher)
+        mcq = ExamQuestion.objects.create(exam=exam, question_text="Q1", question_type="MCQ", order_no=1)
+        right = Choice.objects.create(choice_id=mcq, choice_text="yes", is_correct=True)
+        text = ExamQuestion.objects.create(exam=exam, question_text="Q2", question_type="TEXT", order_no=2)
+        exams.append((exam, mcq, right, text))
+
+    def submit(exam, mcq, right, text, student, minutes_ago):
+        attempt = ExamAttempt.objects.create(exam=exam, student=student, submitted_at=timezone.now() - timedelta(minutes=minutes_ago), score=1)
+        Answer.objects.create(attempt=attempt, question=mcq, selected_choice=right, marks=1)
+        Answer.objects.create(attempt=attempt, question=text, text_answer="because")  # ungraded
+
+    for i, student in enumerate(students[:3]):
+        submit(*exams[0], student, minutes_ago=10 - i)
+    submit(*exams[1], students[0], minutes_ago=5)
+    submit(*exams[0], students[3], minutes_ago=0)  # within --lag: left for the next run
+
+    call_command("export_columnar", out=str(tmp_path), chunk_size=2, stdout=StringIO())
+    first = columnar.load_exam(tmp_path / exams[0][0].exam_id)
+    assert len(first["marks"]) == 6 and np.isnan(first["marks"]).sum() == 3
+    assert list(first["students"][first["student"][::2]]) == [s.student_ID for s in students[:3]]
+    assert first["question_no"][first["question"][:2]].tolist() == [1, 2]
+    assert first["choice_correct"][first["choice"][0]] and first["choice"][1] == -1
+
+    # the next run appends only the new attempt
+    out = StringIO()
+    call_command("export_columnar", out=str(tmp_path), lag=0, stdout=out)
+    assert f"{exams[0][0].exam_id}: 2 answer(s) appended." in out.getvalue()
+    assert len(columnar.load_exam(tmp_path / exams[0][0].exam_id)["marks"]) == 8
+
+    semester = columnar.load(tmp_path)
+    assert list(semester["exams"]) == [exams[0][0].exam_id, exams[1][0].exam_id]
+    assert len(semester["marks"]) == 10 and len(semester["students"]) == 4
+    # the same student keeps one index across exams
+    assert semester["student"][semester["exam"] == 1][0] == semester["student"][0]
+
+
+@pytest.mark.django_db
+def test_columnar_export_stops_at_queued_submissions(tmp_path):
+    from io import StringIO
+    from django.core.management import call_command
+    from app import columnar
+    from app.submissions import process_queue
+
+    teacher = Instructor.objects.create(full_name="Test Teacher",instructor_email="t@example.com",password="pass")
+    exam = Exam.objects.create(title="Exam", start_time=timezone.now(), end_time=timezone.now() + timedelta(hours=1), created_by=teacher)
+    question = ExamQuestion.objects.create(exam=exam, question_text="Q1", question_type="MCQ", order_no=1)
+    right = Choice.objects.create(choice_id=question, choice_text="yes", is_correct=True)
+    attempts = []
+    for i in range(3):
+        student = Student.objects.create(full_name=f"Stu {i}",student_email=f"stu{i}@example.com",matric_number=f"A{i:03d}",password="pass")
+        attempt = ExamAttempt.objects.create(exam=exam, student=student, submitted_at=timezone.now() - timedelta(minutes=10 - i))
+        attempts.append(attempt)
+    # the middle attempt still waits for process_submissions; the others were graded inline
+    for attempt in (attempts[0], attempts[2]):
+        Answer.objects.create(attempt=attempt, question=question, selected_choice=right, marks=1)
+    QueuedSubmission.objects.create(attempt=attempts[1], payload={f"q_{question.id}": str(right.id)})
+
+    call_command("export_columnar", out=str(tmp_path), stdout=StringIO())
+    exported = columnar.load_exam(tmp_path / exam.exam_id)
+    # the watermark stops before the queued attempt, so the later one waits too
+    assert list(exported["attempts"]) == [attempts[0].attempt_id]
+
+    process_queue()
+    call_command("export_columnar", out=str(tmp_path), stdout=StringIO())
+    exported = columnar.load_exam(tmp_path / exam.exam_id)
+    assert list(exported["attempts"]) == [a.attempt_id for a in attempts]
+    assert exported["marks"].tolist() == [1, 1, 1]
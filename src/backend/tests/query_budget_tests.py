@@ -0,0 +1,201 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from app.models import Answer, Choice, Exam, ExamAttempt, ExamQuestion, ExamStats, Instructor, Student
+from app.urls import urlpatterns
+
+# Query budgets: the most queries a GET of each URL in app/urls.py may run.
+# Every page is loaded against datasets of growing size; a view (or template)
+# that starts querying per row blows its budget on the larger datasets.
+# The request.account snapshot is warmed first, so the numbers are steady-state;
+# pages that delete on GET are warmed through another page of the same role.
+# The count must also stay the same across dataset sizes: growing with the
+# rows is a per-row query even while it is still under the budget.
+
+DATASET_SIZES = [1, 3, 8]
+
+# GET deletes the exam / question, so the page is only loaded once per dataset
+DESTRUCTIVE = {"instructor_exam_delete", "instructor_question_delete"}
+
+BUDGETS = {
+    "homepage": 0,
+    "signup_role_select": 0,
+    "universal_login": 0,
+    "logout": 0,
+    "student_login": 0,
+    "instructor_login": 0,
+    "student_register": 0,
+    "instructor_register": 0,
+    "instructor_exam_list": 1,
+    "instructor_exam_create": 0,
+    "instructor_exam_detail": 3,
+    "instructor_question_update": 3,
+    "instructor_choice_update": 3,
+    "instructor_exam_update": 1,
+    "instructor_exam_delete": 13,  # collecting and deleting the cascade, one batch per table
+    "instructor_question_create": 1,
+    "instructor_question_delete": 16,  # the cascade, then the exam totals and its re-bucketed stats
+    "instructor_choice_add": 2,
+    "student_available_exams": 2,
+    "student_available_exams_alias": 2,
+    "student_take_exam": 3,
+    "student_exam_result": 4,
+    "student_autosave_answers": 0,
+    "student_results": 2,
+    "instructor_exam_submissions": 2,
+    "instructor_grade_distribution": 3,
+    "instructor_view_submission": 3,
+    "instructor_student_history": 2,
+    "instructor_results": 2,
+    "instructor_results_by_exam": 5,
+    "instructor_results_by_student": 4,
+    "instructor_exam_export": 3,  # exam, attempts, one students query per chunk
+    "instructor_export": 3,       # exams, attempts, one students query per chunk
+    "student_profile": 6,
+    "instructor_profile": 4,
+    "metrics": 3,
+}
+
+
+def build_dataset(size):
+    """
+    size instructors' worth of data: size exams (MCQ + TEXT questions), size students
+    who all submitted every exam, some text answers still ungraded.
+    """
+    now = timezone.now()
+    instructor = Instructor.objects.create(full_name="Inst", instructor_email="inst@example.com", password="pw")
+    students = [
+        Student.objects.create(full_name=f"Stu {i}", student_email=f"stu{i}@example.com", matric_number=f"PPE{i:04d}", password="pw")
+        for i in range(size)
+    ]
+    exams = []
+    for e in range(size):
+        exam = Exam.objects.create(
+            title=f"Exam {e}",
+            start_time=now - timedelta(hours=1),
+            end_time=now + timedelta(hours=1),
+            created_by=instructor,
+        )
+        exams.append(exam)
+        questions = []
+        for q in range(size):
+            question = ExamQuestion.objects.create(exam=exam, question_text=f"Q{q}", question_type="MCQ", order_no=q + 1)
+            right = Choice.objects.create(choice_id=question, choice_text="right", is_correct=True)
+            Choice.objects.create(choice_id=question, choice_text="wrong", is_correct=False)
+            questions.append((question, right))
+        text_question = ExamQuestion.objects.create(exam=exam, question_text="Explain", question_type="TEXT", order_no=size + 1)
+
+        for s, student in enumerate(students):
+            attempt = ExamAttempt.objects.create(exam=exam, student=student, submitted_at=now, score=size)
+            Answer.objects.bulk_create(
+                [Answer(attempt=attempt, question=question, selected_choice=right, marks=1) for question, right in questions]
+                + [Answer(attempt=attempt, question=text_question, text_answer="because", marks=1 if s % 2 else None)]
+            )
+        ExamStats.rebuild(exam)
+
+    # one open exam the first student has not taken yet
+    open_exam = Exam.objects.create(
+        title="Open",
+        start_time=now - timedelta(hours=1),
+        end_time=now + timedelta(hours=1),
+        created_by=instructor,
+    )
+    for q in range(size):
+        question = ExamQuestion.objects.create(exam=open_exam, question_text=f"Open Q{q}", question_type="MCQ", order_no=q + 1)
+        Choice.objects.create(choice_id=question, choice_text="a", is_correct=True)
+        Choice.objects.create(choice_id=question, choice_text="b", is_correct=False)
+
+    student = students[0]
+    attempt = ExamAttempt.objects.get(exam=exams[0], student=student)
+    question = exams[0].questions.order_by("order_no").first()
+    return {
+        "instructor": instructor,
+        "student": student,
+        "exam": exams[0],
+        "open_exam": open_exam,
+        "attempt": attempt,
+        "question": question,
+        "choice": question.choices.first(),
+    }
+
+
+def page(name, data):
+    """
+    returns: (role, url) to GET for a budget entry
+    """
+    exam_id = data["exam"].exam_id
+    attempt_id = data["attempt"].attempt_id
+    question_id = data["question"].id
+    args = {
+        "instructor_exam_detail": [exam_id],
+        "instructor_exam_update": [exam_id],
+        "instructor_exam_delete": [exam_id],
+        "instructor_question_create": [exam_id],
+        "instructor_question_delete": [exam_id, question_id],
+        "instructor_question_update": [question_id],
+        "instructor_choice_add": [question_id],
+        "instructor_choice_update": [data["choice"].id],
+        "instructor_exam_submissions": [exam_id],
+        "instructor_grade_distribution": [exam_id],
+        "instructor_exam_export": [exam_id],
+        "instructor_view_submission": [attempt_id],
+        "instructor_student_history": [data["student"].student_ID],
+        "student_take_exam": [data["open_exam"].exam_id],
+        "student_exam_result": [attempt_id],
+        "student_autosave_answers": [attempt_id],
+    }
+    query = ""
+    if name == "instructor_results_by_exam":
+        name, query = "instructor_results", f"?exam_id={exam_id}"
+    elif name == "instructor_results_by_student":
+        name, query = "instructor_results", f"?student_id={data['student'].student_ID}"
+    role = "student" if name.startswith("student_") else "instructor" if name.startswith("instructor_") else None
+    if name == "metrics":
+        role = "instructor"
+    return role, reverse(name, args=args.get(name, [])) + query
+
+
+def login(client, role, data):
+    session = client.session
+    session["user_type"] = role
+    session["user_id"] = data[role].pk
+    session.save()
+
+
+def test_every_url_has_a_budget():
+    names = {pattern.name for pattern in urlpatterns}
+    assert names <= set(BUDGETS), names - set(BUDGETS)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("name", sorted(BUDGETS))
+def test_query_budget(client, name):
+    counts = []
+    for size in DATASET_SIZES:
+        # each size gets a fresh dataset inside the test transaction
+        Exam.objects.all().delete()
+        Student.objects.all().delete()
+        Instructor.objects.all().delete()
+        data = build_dataset(size)
+
+        role, url = page(name, data)
+        if role:
+            login(client, role, data)
+            # warm-up: request.account snapshot, cached exam paper
+            client.get(reverse(f"{role}_profile") if name in DESTRUCTIVE else url)
+        with CaptureQueriesContext(connection) as ctx:
+            resp = client.get(url)
+            assert resp.status_code < 500 and resp.status_code != 404, url
+            if resp.streaming:
+                # a streamed body runs its queries while it is read
+                b"".join(resp.streaming_content)
+        counts.append(len(ctx.captured_queries))
+
+    message = f"{name}: {counts} queries for dataset sizes {DATASET_SIZES}"
+    assert max(counts) <= BUDGETS[name], message
+    assert len(set(counts)) == 1, message
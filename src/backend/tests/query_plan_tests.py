@@ -0,0 +1,113 @@
+import re
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from app.models import Answer, Choice, Exam, ExamAttempt, ExamQuestion, ExamStats, Instructor, Student
+
+# Query-plan regression check: every SELECT the results and listing pages run
+# against the app tables must be answered through an index. SQLite reports a
+# full table scan as "SCAN <table>" ("SCAN TABLE <table>" before 3.36) without
+# "USING ... INDEX".
+
+FULL_SCAN = re.compile(r"\bSCAN (?:TABLE )?(app_\w+)(?!.*USING (?:COVERING )?INDEX)")
+INDEX_USED = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+
+# composite indexes from migration 0008; each must be picked by at least one page query
+COMPOSITE_INDEXES = {
+    "exam_creator_created_idx",
+    "exam_window_idx",
+    "attempt_exam_submitted_idx",
+    "attempt_student_submitted_idx",
+    "question_exam_order_idx",
+}
+
+
+def login(client, role, user_id):
+    session = client.session
+    session["user_type"] = role
+    session["user_id"] = user_id
+    session.save()
+
+
+@pytest.fixture
+def dataset():
+    now = timezone.now()
+    instructors = [
+        Instructor.objects.create(full_name=f"Inst {i}", instructor_email=f"inst{i}@example.com", password="pw")
+        for i in range(2)
+    ]
+    students = [
+        Student.objects.create(full_name=f"Stu {i}", student_email=f"stu{i}@example.com", matric_number=f"PPE{i:04d}", password="pw")
+        for i in range(6)
+    ]
+    exams = []
+    for instructor in instructors:
+        for e in range(3):
+            exam = Exam.objects.create(
+                title=f"Exam {e}",
+                start_time=now - timedelta(hours=1),
+                end_time=now + timedelta(hours=1),
+                created_by=instructor,
+            )
+            exams.append(exam)
+            for q in range(4):
+                question = ExamQuestion.objects.create(exam=exam, question_text=f"Q{q}", question_type="MCQ", order_no=q + 1)
+                right = Choice.objects.create(choice_id=question, choice_text="right", is_correct=True)
+                Choice.objects.create(choice_id=question, choice_text="wrong", is_correct=False)
+                for student in students:
+                    attempt, _ = ExamAttempt.objects.get_or_create(exam=exam, student=student)
+                    Answer.objects.create(attempt=attempt, question=question, selected_choice=right, marks=1)
+    ExamAttempt.objects.update(submitted_at=now, score=4)
+    for exam in exams:
+        ExamStats.rebuild(exam)
+    return instructors[0], students[0], exams[0]
+
+
+def query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN QUERY PLAN " + sql)
+        return [detail for *_, detail in cursor.fetchall()]
+
+
+def page_urls(instructor, student, exam):
+    attempt = ExamAttempt.objects.get(exam=exam, student=student)
+    return [
+        ("instructor", instructor.instructor_ID, reverse("instructor_exam_list")),
+        ("instructor", instructor.instructor_ID, reverse("instructor_exam_detail", args=[exam.exam_id])),
+        ("instructor", instructor.instructor_ID, reverse("instructor_exam_submissions", args=[exam.exam_id])),
+        ("instructor", instructor.instructor_ID, reverse("instructor_grade_distribution", args=[exam.exam_id])),
+        ("instructor", instructor.instructor_ID, reverse("instructor_view_submission", args=[attempt.attempt_id])),
+        ("instructor", instructor.instructor_ID, reverse("instructor_student_history", args=[student.student_ID])),
+        ("instructor", instructor.instructor_ID, reverse("instructor_results") + f"?exam_id={exam.exam_id}"),
+        ("instructor", instructor.instructor_ID, reverse("instructor_results") + f"?student_id={student.student_ID}"),
+        ("instructor", instructor.instructor_ID, reverse("instructor_profile")),
+        ("student", student.student_ID, reverse("student_available_exams")),
+        ("student", student.student_ID, reverse("student_results")),
+        ("student", student.student_ID, reverse("student_exam_result", args=[attempt.attempt_id])),
+        ("student", student.student_ID, reverse("student_profile")),
+    ]
+
+
+@pytest.mark.django_db
+def test_results_and_listing_pages_use_indexes(client, dataset):
+    instructor, student, exam = dataset
+    problems = []
+    used = set()
+    for role, user_id, url in page_urls(instructor, student, exam):
+        login(client, role, user_id)
+        with CaptureQueriesContext(connection) as ctx:
+            assert client.get(url).status_code == 200, url
+        for query in ctx.captured_queries:
+            if not query["sql"].startswith("SELECT"):
+                continue
+            for detail in query_plan(query["sql"]):
+                used.update(INDEX_USED.findall(detail))
+                if FULL_SCAN.search(detail):
+                    problems.append(f"{url}: {detail}\n    {query['sql']}")
+    assert not problems, "\n".join(problems)
+    assert COMPOSITE_INDEXES <= used, COMPOSITE_INDEXES - used